@@ -0,0 +1,34 @@
+import json
+import os
+import sys
+import requests
+
+
+# Records live API responses into benchmarks/fixtures for the stand-in server to replay
+# Usage: python benchmarks/record.py [lat lon]
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+HEADERS = {"User-Agent": "sweater-weather"}
+
+
+def record(name, url, **kwargs):
+    response = requests.get(url, headers=HEADERS, timeout=30, **kwargs)
+    response.raise_for_status()
+    with open(os.path.join(FIXTURES, name), "w") as file:
+        json.dump(response.json(), file, indent=1)
+    print(f"Recorded {name} from {response.url}")
+    return response.json()
+
+
+def main(argv):
+    lat, lon = (float(argv[0]), float(argv[1])) if len(argv) == 2 else (32.9483, -96.7299)
+    record("ip_api.json", "http://ip-api.com/json/")
+    record("nominatim.json", "https://nominatim.openstreetmap.org/search", params={"q": "Richardson, TX", "format": "json", "limit": 1})
+    point = record("points.json", f"https://api.weather.gov/points/{lat:.4f},{lon:.4f}")["properties"]
+    record("forecast.json", point["forecast"])
+    record("forecast_hourly.json", point["forecastHourly"])
+    record("gridpoints.json", point["forecastGridData"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,357 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCHMARKS)
+from stub_server import FIXTURES, StubServer  # noqa: E402
+
+
+# Offline benchmark suite; replays recorded responses from a local stub server and writes results as JSON
+# Usage: python benchmarks/run.py [--output results.json] [--compare previous.json] [--quick]
+
+
+# Times fn `repeat` times, calling setup (untimed) before each run; returns summary statistics in milliseconds
+def measure(fn, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": min(times), "median_ms": statistics.median(times), "mean_ms": statistics.fmean(times), "runs": repeat}
+
+
+# Makes `count` random rules split between clothing and ratings, seeded so every run compares like with like
+# With compound, each rule also needs a wind speed range or a time of day (see rules.parse_condition)
+def make_engine(count, compound=False):
+    from sweater_weather.preferences import ClothingRule, RatingRule
+    from sweater_weather.rules import FACTORS, RuleEngine, TIMES_OF_DAY, parse_condition
+    rng = random.Random(count)
+    clothing, ratings = [], []
+    for i in range(count):
+        factor = rng.choice(FACTORS[:3])  # Only the original factors, so results stay comparable with earlier runs
+        low = rng.randint(0, 3) if factor == "precipitation" else rng.randint(-10, 90)
+        high = min(low + rng.randint(0, 2), 3) if factor == "precipitation" else low + rng.randint(0, 30)
+        when = None
+        if compound:
+            wind = rng.randint(0, 25)
+            when = parse_condition({"any": [{"factor": "wind speed", "min": wind, "max": wind + 10}, {"time": rng.choice(list(TIMES_OF_DAY))}]})
+        if i % 2:
+            ratings.append(RatingRule(f"rating {i}", factor, low, high, when))
+        else:
+            clothing.append(ClothingRule(rng.choice(["all seasons", "autumn", "winter"]), f"item {i % 40}", factor, low, high, when))
+    return RuleEngine(clothing, ratings)
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), "r") as file:
+        return json.load(file)["properties"]["periods"]
+
+
+# Points the shared cache, geocode index and HTTP client at fresh state in `directory`
+def reset_state(directory):
+    from sweater_weather import geocode, grid_index, http_cache, http_client, recorder
+    http_cache._cache = http_cache.HttpCache(os.path.join(directory, f"cache-{time.perf_counter_ns()}.sqlite"))
+    geocode._index = geocode.GeocodeIndex(os.path.join(directory, f"geocode-{time.perf_counter_ns()}.json"))
+    http_client._client = http_client.HttpClient()
+    recorder._recorder = recorder.HistoryRecorder(os.path.join(directory, "history"))
+    grid_index._index = grid_index.GridIndex(os.path.join(directory, f"gridcells-{time.perf_counter_ns()}.json"))
+
+
+def fetch_benchmarks(server, directory, repeat):
+    from sweater_weather import core
+
+    def fetch():
+        lat, lon, _ = core.resolve_location("Richardson Heights, TX")  # Not in the gazetteer, so Nominatim is asked
+        core.fetch_periods(lat, lon)
+
+    results = {}
+    server.max_age = 3600
+    results["fetch_cold"] = measure(fetch, repeat, lambda: reset_state(directory))
+    reset_state(directory)
+    fetch()
+    results["fetch_warm"] = measure(fetch, repeat * 5)
+    server.max_age = 0  # Every lookup revalidates and gets a 304
+    reset_state(directory)
+    fetch()
+    results["fetch_revalidate"] = measure(fetch, repeat)
+    # A coordinate never asked for before, but inside the grid cell already fetched: the grid cell index answers /points
+    server.max_age = 3600
+    reset_state(directory)
+    core.fetch_periods(32.94, -96.735)
+    nearby = iter(range(1, 10 ** 6))
+    results["fetch_nearby"] = measure(lambda: core.fetch_periods(32.94 + next(nearby) * 1e-6, -96.735), repeat)
+    return results
+
+
+# Times filling the dashboard with 20 gazetteer cities from a cold cache while every response takes 50 ms
+# Fetched one after another this would take at least 20 x 2 x 50 ms
+def dashboard_benchmarks(server, directory, repeat):
+    from sweater_weather import dashboard
+    from sweater_weather.geocode import GAZETTEER_PATH
+    with open(GAZETTEER_PATH, "r") as file:
+        names = [",".join(line.split(",")[:2]) for line in file.readlines()[1:21]]
+    engine = make_engine(10)
+    server.max_age, server.latency = 3600, 0.05
+    results = {"dashboard_20_locations": measure(lambda: list(dashboard.fetch_dashboard(names, engine, "autumn")), repeat, lambda: reset_state(directory))}
+    server.latency = 0.0
+    return results
+
+
+def report_benchmarks(repeat):
+    from sweater_weather import core, hourly
+    from sweater_weather.precipitation import PrecipitationClassifier
+    periods = {14: load_fixture("forecast.json"), 156: load_fixture("forecast_hourly.json")}
+    for p in periods[156]:
+        p["detailedForecast"] = p["shortForecast"]
+    results = {}
+    for count in (10, 100, 1000):
+        engine = make_engine(count)
+        for n, fixture in periods.items():
+            results[f"report_{count}_rules_{n}_periods"] = measure(lambda: core.report(fixture, engine, "autumn"), repeat)
+        results[f"hourly_report_{count}_rules"] = measure(lambda: hourly.report(periods[156], engine, "autumn"), repeat)
+    # Rules with extra conditions, which are only tested once a rule's own range matches
+    engine = make_engine(100, compound=True)
+    results["report_100_compound_rules_156_periods"] = measure(lambda: core.report(periods[156], engine, "autumn"), repeat)
+    results["hourly_report_100_compound_rules"] = measure(lambda: hourly.report(periods[156], engine, "autumn"), repeat)
+    # Hourly arrays decoded from gridpoint data instead of parsed from forecast text
+    from sweater_weather.gridpoints import GridSeries
+    from sweater_weather.hourly import HourlyForecast
+    with open(os.path.join(FIXTURES, "gridpoints.json"), "r") as file:
+        grid = json.load(file)["properties"]
+    results["hourly_decode_text"] = measure(lambda: HourlyForecast(periods[156]), repeat)
+    results["hourly_decode_grid"] = measure(lambda: HourlyForecast.from_grid(GridSeries(grid, "America/Chicago")), repeat)
+    texts = [p["detailedForecast"] for p in periods[14]] + [p["shortForecast"] for p in periods[156]]
+    classifier = PrecipitationClassifier()
+    results["classify_uncached"] = measure(lambda: [classifier.scan(text) for text in texts], repeat)
+    results["classify_cached"] = measure(lambda: [classifier.classify(text) for text in texts], repeat)
+    return results
+
+
+# Fills a history store with a year of forecasts for 100 grid cells (about 4 million rows, 150 MB), then times loading and querying it
+# Each grid cell gets a 12-hour forecast every 3 hours, whose 14 periods are forecast again by the next few issues
+def history_benchmarks(directory, repeat):
+    import numpy as np
+    from sweater_weather import history
+    path = os.path.join(directory, "history-benchmark")
+    store = history.HistoryStore(path)
+    rng = np.random.default_rng(0)
+    start = 1761955200  # 2025-11-01 00:00 UTC
+    issues = start + 3 * 3600 * np.arange(2920)  # A year of issues, 3 hours apart
+    for chunk in np.array_split(issues, 40):
+        issued = np.repeat(np.repeat(chunk, 14), 100)
+        n = len(issued)
+        period = np.tile(np.repeat(np.arange(14), 100), len(chunk))
+        store.append({
+            "time": issued // 43200 * 43200 + 43200 * (period + 1),
+            "hours": np.full(n, 12),
+            "hour": np.where(period % 2, 18, 6),
+            "grid": np.tile(np.arange(100), 14 * len(chunk)),
+            "issued": issued,
+            "temperature": rng.normal(55, 15, n).round(),
+            "wind": rng.integers(0, 30, n),
+            "precipitation": rng.integers(0, 4, n),
+            "chance": rng.integers(0, 100, n),
+        })
+    store.grids = [f"FWD/{i},100" for i in range(100)]
+    november = (start, start + 30 * 86400)
+    engine = make_engine(100)
+    return {
+        "history_open_4m_rows": measure(lambda: history.HistoryStore(path).columns(), repeat),
+        "history_select_month": measure(lambda: store.select(*november), repeat),
+        "history_select_month_one_location": measure(lambda: store.select(*november, grid="FWD/7,100"), repeat),
+        "history_suggestion_counts_month": measure(lambda: history.suggestion_counts(store.select(*november), engine), repeat),
+        "history_drift_month": measure(lambda: history.drift(store.select(*november)), repeat),
+    }
+
+
+# Times 400 report requests for a city already fetched, sent over 8 keep-alive connections to the report service
+# and 400 requests for 20 cities fetched at once from a cold cache while every response takes 50 ms
+def serve_benchmarks(server, directory, repeat):
+    import asyncio
+    import http.client
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from urllib.parse import quote
+    from sweater_weather.geocode import GAZETTEER_PATH
+    from sweater_weather.preferences import PreferencesStore, rule_entry
+    from sweater_weather.server import ReportService
+    with open(GAZETTEER_PATH, "r") as file:
+        cities = [",".join(line.split(",")[:2]) for line in file.readlines()[1:21]]
+    engine = make_engine(10)
+    preferences = {"clothing": [rule_entry(rule) for rule in engine.clothing], "ratings": [rule_entry(rule) for rule in engine.ratings]}
+    service = ReportService(store=PreferencesStore(directory))
+    started = threading.Event()
+    port = []
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(service.serve(port=0, started=lambda bound: (port.append(bound), started.set())))
+    threading.Thread(target=lambda: loop.run_until_complete(asyncio.wait([task])), daemon=True).start()
+    started.wait()
+
+    def send(names):
+        connection = http.client.HTTPConnection("127.0.0.1", port[0])
+        body = json.dumps(preferences)
+        for name in names:
+            connection.request("POST", f"/report?city={quote(name)}", body)
+            response = connection.getresponse()
+            response.read()
+            assert response.status == 200, response.status
+        connection.close()
+
+    def requests(names):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(send, [names[i::8] for i in range(8)]))
+
+    def cold():
+        reset_state(directory)
+        service.forecasts.clear()
+        service.reports.clear()
+
+    server.max_age = 3600
+    cold()
+    send(cities[:1])
+    results = {"serve_400_cached_reports": measure(lambda: requests(cities[:1] * 400), repeat)}
+    server.latency = 0.05
+    results["serve_400_reports_20_cities_cold"] = measure(lambda: requests(cities * 20), max(3, repeat // 4), cold)
+    server.latency = 0.0
+    loop.call_soon_threadsafe(task.cancel)
+    return results
+
+
+# Times fresh interpreters importing the GUI module and running the batch CLI's help
+def startup_benchmarks(repeat):
+    results = {}
+    commands = {
+        "startup_import_gui": [sys.executable, "-c", "import sweater_weather.gui"],
+        "startup_cli_help": [sys.executable, os.path.join(ROOT, "sweater-weather.py"), "batch", "--help"],
+    }
+    for name, command in commands.items():
+        if subprocess.run(command, cwd=ROOT, capture_output=True).returncode != 0:
+            continue  # e.g. PyQt5 is not installed
+        results[name] = measure(lambda: subprocess.run(command, cwd=ROOT, capture_output=True), repeat)
+    try:
+        import PyQt5  # noqa: F401
+    except ImportError:
+        return results
+    from startup import first_paint
+    env = {**os.environ, "QT_QPA_PLATFORM": "offscreen"}
+    runs = [first_paint(env) for _ in range(repeat)]
+    for milestone in ("splash_ms", "first_paint_ms"):
+        times = [run[milestone] for run in runs if milestone in run]
+        if times:
+            results[f"startup_{milestone[:-3]}"] = {"min_ms": min(times), "median_ms": statistics.median(times), "mean_ms": statistics.fmean(times), "runs": len(times)}
+    return results
+
+
+# Times the whole Get Forecast click, from the button handler until the report is shown, on an offscreen window
+def gui_benchmarks(directory, repeat):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtWidgets import QApplication
+        from sweater_weather.gui import SweaterWeatherApp
+    except ImportError:
+        return {}
+    app = QApplication.instance() or QApplication([])
+    window = SweaterWeatherApp()
+    window.location_input.setText("Richardson Heights, TX")
+
+    def click():
+        window.handle_forecast_fetch()
+        while window.active_worker or window.forecast_model.streaming():
+            app.processEvents()
+
+    results = {
+        "gui_fetch_cold": measure(click, repeat, lambda: reset_state(directory)),
+        "gui_fetch_warm": measure(click, repeat),
+    }
+    # Opening the preferences editor on 10 and 1,000 rules, until it is on screen
+    from sweater_weather.editor import RulesEditor
+    for count in (10, 1000):
+        entries = [rule._asdict() for rule in make_engine(count * 2).clothing]
+
+        def open_editor():
+            editor = RulesEditor("clothing", entries)
+            editor.show()
+            app.processEvents()
+            editor.close()
+
+        results[f"editor_open_{count}_rules"] = measure(open_editor, repeat)
+    # Saving one edited rule of about 100 while a 12-hour report is on screen, until the report shows it
+    from sweater_weather.preferences import get_preferences_store, rule_entry
+    store = get_preferences_store()
+    entries = [rule_entry(rule) for rule in make_engine(200).clothing]
+    store.save("clothing", entries)
+    click()
+
+    def edit():
+        entries[-1]["max"] += 1
+        store.save("clothing", entries)
+        app.processEvents()
+
+    results["gui_preferences_change"] = measure(edit, repeat)
+    return results
+
+
+# Prints each benchmark's median next to the one in a previous results file
+def compare(results, previous_path):
+    with open(previous_path, "r") as file:
+        previous = json.load(file)["results"]
+    print(f"\n{'benchmark':<36}{'before':>12}{'after':>12}{'change':>10}")
+    for name, stats in results.items():
+        if name in previous:
+            before, after = previous[name]["median_ms"], stats["median_ms"]
+            print(f"{name:<36}{before:>10.3f}ms{after:>10.3f}ms{(after / before - 1) * 100 if before else 0:>+9.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline Sweater Weather benchmarks.")
+    parser.add_argument("-o", "--output", default="benchmark-results.json", help="where to write results (default: benchmark-results.json)")
+    parser.add_argument("--compare", metavar="FILE", help="previous results to compare against")
+    parser.add_argument("--quick", action="store_true", help="fewer repetitions")
+    args = parser.parse_args(argv)
+    repeat = 5 if args.quick else 20
+    server = StubServer()
+    server.start()
+    directory = tempfile.mkdtemp(prefix="sweater-weather-bench-")  # Holds a 150 MB history among other things; removed at the end
+    try:
+        os.environ.update(server.environ())
+        os.environ["SWEATER_WEATHER_HOME"] = directory  # Keep the user's own preferences and caches out of it
+        results = {}
+        results.update(fetch_benchmarks(server, directory, repeat))
+        results.update(dashboard_benchmarks(server, directory, max(3, repeat // 4)))
+        results.update(report_benchmarks(repeat))
+        results.update(history_benchmarks(directory, max(3, repeat // 4)))
+        results.update(serve_benchmarks(server, directory, repeat))
+        results.update(startup_benchmarks(max(3, repeat // 4)))
+        results.update(gui_benchmarks(directory, repeat))
+        try:
+            commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        except OSError:
+            commit = None
+        output = {"commit": commit, "python": platform.python_version(), "platform": platform.platform(), "time": time.time(), "results": results}
+        with open(args.output, "w") as file:
+            json.dump(output, file, indent=1)
+        for name, stats in results.items():
+            print(f"{name:<36}{stats['median_ms']:>10.3f}ms")
+        if args.compare:
+            compare(results, args.compare)
+    finally:
+        server.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
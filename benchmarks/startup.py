@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+
+# Startup benchmark: time to splash and to first paint of the main window, plus an -X importtime breakdown
+# Usage: python benchmarks/startup.py [--runs N] [--output startup.json] [--check]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = {"splash_ms": 100, "first_paint_ms": 300}  # Medians measured from process launch
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+# Runs sweater-weather.py with a splash screen that prints "splash" once it is shown and "first-paint" once the
+# main window's first paint events are handled, then quits; the application itself knows nothing about it
+PROBE = """
+import runpy, sys
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QTimer
+
+class ProbeSplash(QtWidgets.QSplashScreen):
+    def show(self):
+        super().show()
+        QtWidgets.QApplication.processEvents()
+        print("splash", flush=True)
+
+    def finish(self, window):
+        super().finish(window)
+        QTimer.singleShot(0, first_paint)
+
+def first_paint():
+    print("first-paint", flush=True)
+    QtWidgets.QApplication.instance().quit()
+
+QtWidgets.QSplashScreen = ProbeSplash
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+# Launches the application under PROBE; returns {milestone: ms since launch}
+def first_paint(env=None):
+    env = dict(os.environ if env is None else env)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", PROBE, os.path.join(ROOT, "sweater-weather.py")], cwd=ROOT, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    milestones = {}
+    for line in process.stdout:
+        milestones[line.strip() + "_ms"] = (time.perf_counter() - start) * 1000
+        if line.strip() == "first-paint":
+            break
+    process.wait(timeout=30)
+    return {name.replace("-", "_"): value for name, value in milestones.items()}
+
+
+# Runs -X importtime on the GUI module; returns the total and the slowest top-level imports in ms
+def import_times(module="sweater_weather.gui", top=15):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, capture_output=True, text=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000, "depth": len(indent) // 2})
+    total = next((e["cumulative_ms"] for e in entries if e["module"] == module), None)
+    ours = [e for e in entries if e["module"].startswith("sweater_weather") or e["depth"] <= 1]
+    return {"total_ms": total, "slowest": sorted(ours, key=lambda e: e["cumulative_ms"], reverse=True)[:top]}
+
+
+# Times a bare interpreter, the part of startup the application cannot change
+def interpreter_startup():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2] if ordered else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Sweater Weather startup time.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("-o", "--output", help="write results as JSON")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if a target is missed")
+    args = parser.parse_args(argv)
+    try:
+        import PyQt5  # noqa: F401
+    except ImportError:
+        print("PyQt5 is not installed; nothing to measure.", file=sys.stderr)
+        return 1
+    runs = [first_paint() for _ in range(args.runs)]
+    results = {name: median([run[name] for run in runs if name in run]) for name in TARGETS}
+    results["interpreter_ms"] = median([interpreter_startup() for _ in range(args.runs)])
+    imports = import_times()
+    print(f"{'milestone':<20}{'median':>10}{'target':>10}")
+    missed = False
+    for name, target in TARGETS.items():
+        value = results[name]
+        missed |= value is None or value > target
+        shown = "never" if value is None else f"{value:.1f}ms"
+        print(f"{name:<20}{shown:>10}{target:>8}ms{'' if value is not None and value <= target else '  MISSED'}")
+    print(f"{'(bare interpreter)':<20}{results['interpreter_ms']:>8.1f}ms")
+    print(f"\nimport sweater_weather.gui: {imports['total_ms']:.1f}ms")
+    for entry in imports["slowest"]:
+        print(f"  {'  ' * entry['depth']}{entry['module']:<40}{entry['cumulative_ms']:>8.1f}ms")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"targets": TARGETS, "results": results, "runs": runs, "imports": imports}, file, indent=1)
+    return 1 if args.check and missed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+# Local stand-in for api.weather.gov, ip-api and Nominatim that replays the recorded fixtures
+# Usage: python benchmarks/stub_server.py [port]
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RECORDED_BASE = "https://api.weather.gov"
+
+
+# Picks the fixture for a request path
+def fixture_name(path):
+    if path.startswith("/points/"):
+        return "points.json"
+    if path.endswith("/forecast/hourly"):
+        return "forecast_hourly.json"
+    if path.endswith("/forecast"):
+        return "forecast.json"
+    if path.startswith("/gridpoints/"):
+        return "gridpoints.json"
+    if path.startswith("/json"):
+        return "ip_api.json"
+    if path.startswith("/search"):
+        return "nominatim.json"
+    return None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real services
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.server.requests += 1
+        name = fixture_name(urlsplit(self.path).path)
+        if name is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body, etag = self.server.bodies[name]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", f"public, max-age={self.server.max_age}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/geo+json")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", f"public, max-age={self.server.max_age}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Threaded stub server; links inside the fixtures are rewritten to point back at it
+# max_age sets the Cache-Control lifetime, and latency adds a delay to every response
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, max_age=0):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.latency = latency
+        self.max_age = max_age
+        self.requests = 0
+        self.bodies = {}
+        for name in os.listdir(FIXTURES):
+            if name.endswith(".json"):
+                with open(os.path.join(FIXTURES, name), "rb") as file:
+                    body = file.read().replace(RECORDED_BASE.encode(), self.url.encode())
+                self.bodies[name] = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    # Environment variables that point the application at this server
+    def environ(self):
+        return {
+            "SWEATER_WEATHER_NWS_URL": self.url,
+            "SWEATER_WEATHER_IP_API_URL": self.url + "/json/",
+            "SWEATER_WEATHER_NOMINATIM_URL": self.url + "/search",
+        }
+
+    # Serves in a background thread; returns the thread
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+if __name__ == "__main__":
+    server = StubServer(int(sys.argv[1]) if len(sys.argv) > 1 else 8080)
+    print(json.dumps(server.environ(), indent=1))
+    server.serve_forever()
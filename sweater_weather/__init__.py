@@ -0,0 +1 @@
+# Sweater Weather core package
@@ -0,0 +1,199 @@
+import argparse
+import csv
+import json
+import re
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from sweater_weather import core, metrics, weather
+from sweater_weather.preferences import PreferencesStore, get_preferences_store
+from sweater_weather.rules import SEASONS
+
+
+COORDINATES = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*[,\s]\s*(-?\d+(?:\.\d+)?)\s*$")
+CSV_FIELDS = ["input", "location", "lat", "lon", "time", "temperature", "precipitation", "wind", "suggestions", "error"]
+
+
+# Reads locations from a file, one city name or "lat, lon" pair per line; blank lines and # comments are skipped
+def read_locations(file):
+    for line in file:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+# Fetches and evaluates one location; never raises, so one bad line cannot stop a batch
+def run_location(text, engine, season):
+    result = {"input": text, "location": None, "lat": None, "lon": None, "rows": [], "error": None}
+    try:
+        match = COORDINATES.match(text)
+        if match:
+            lat, lon, label = float(match.group(1)), float(match.group(2)), text
+        else:
+            lat, lon, label = core.resolve_location(text)
+        result.update(location=label, lat=lat, lon=lon)
+        periods = core.fetch_periods(lat, lon)
+        with metrics.span("report"):
+            result["rows"] = [row._asdict() for row in core.report_rows(periods, engine, season)]
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+    return result
+
+
+# Writes each result as one JSON object per line
+def write_jsonl(output, result):
+    output.write(json.dumps(result) + "\n")
+
+
+# Writes one CSV row per reported period, or a single row for a location with an error or no suggestions
+def csv_writer(output):
+    writer = csv.DictWriter(output, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+
+    def write(output, result):
+        base = {field: result[field] for field in ("input", "location", "lat", "lon", "error")}
+        for row in result["rows"] or [None]:
+            if row:
+                writer.writerow({**base, **row, "suggestions": "; ".join(row["suggestions"])})
+            else:
+                writer.writerow(base)
+    return write
+
+
+# Runs locations through a bounded thread pool, writing each result as soon as it is ready
+# At most 4 x workers locations are queued at once, so large input files are streamed rather than loaded
+def run_batch(locations, output, write, workers=8, engine=None, season=None):
+    engine = engine or get_preferences_store().engine()
+    season = season or core.get_season()
+    failures = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for text in locations:
+            pending.add(executor.submit(run_location, text, engine, season))
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                failures += flush(done, output, write)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            failures += flush(done, output, write)
+    return failures
+
+
+# Writes finished results; returns how many failed
+def flush(done, output, write):
+    failures = 0
+    for future in done:
+        result = future.result()
+        failures += result["error"] is not None
+        write(output, result)
+    output.flush()
+    return failures
+
+
+def batch(args):
+    engine = (PreferencesStore(args.preferences) if args.preferences else get_preferences_store()).engine()
+    if not engine.clothing and not engine.ratings:
+        print(core.NO_PREFERENCES, file=sys.stderr)
+        return 1
+    source = sys.stdin if args.file == "-" else open(args.file, "r")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    try:
+        write = write_jsonl if args.format == "jsonl" else csv_writer(output)
+        failures = run_batch(read_locations(source), output, write, args.workers, engine, args.season)
+        if args.metrics:
+            metrics.write_prometheus(args.metrics)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    return 2 if failures else 0
+
+
+# Summarizes the stored forecast history: how often each preference applied and how much forecasts changed
+def history(args):
+    try:
+        from sweater_weather.history import drift, forecast_count, get_history_store, latest, suggestion_counts  # Needs NumPy
+    except ImportError as e:
+        print(f"The forecast history needs NumPy: {e}", file=sys.stderr)
+        return 1
+    grid = None
+    if args.location:
+        match = COORDINATES.match(args.location)
+        lat, lon = (float(match.group(1)), float(match.group(2))) if match else core.resolve_location(args.location)[:2]
+        point = weather.fetch_point(lat, lon)
+        grid = f"{point['gridId']}/{point['gridX']},{point['gridY']}"
+    start = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    end = (datetime.fromisoformat(args.until) + timedelta(days=1)).timestamp() if args.until else None
+    frame = get_history_store().select(start, end, grid, hourly=args.hourly)
+    engine = (PreferencesStore(args.preferences) if args.preferences else get_preferences_store()).engine()
+    changes = drift(frame, args.factor)["change"]
+    summary = {
+        "grid": grid,
+        "forecasts": forecast_count(frame),
+        "periods": int(len(latest(frame)["time"])),
+        "suggestions": suggestion_counts(frame, engine),
+        "drift": {
+            "factor": args.factor,
+            "periods": int(len(changes)),
+            "mean_change": round(float(changes.mean()), 2) if len(changes) else None,
+            "mean_absolute_change": round(float(abs(changes).mean()), 2) if len(changes) else None,
+            "largest_change": round(float(changes[abs(changes).argmax()]), 2) if len(changes) else None,
+        },
+    }
+    print(json.dumps(summary, indent=1))
+    return 0
+
+
+# Serves reports as JSON to many clients until interrupted (see server.py)
+def serve(args):
+    import asyncio
+    from sweater_weather.server import ReportService
+    service = ReportService(args.workers, args.queue, PreferencesStore(args.preferences) if args.preferences else None)
+    try:
+        asyncio.run(service.serve(args.host, args.port, lambda port: print(f"Serving reports on http://{args.host}:{port}/report", file=sys.stderr, flush=True)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="sweater-weather", description="Weather forecasts with personalized clothing suggestions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    batch_parser = commands.add_parser("batch", help="report on many locations at once")
+    batch_parser.add_argument("file", help="file with one city name or 'lat, lon' pair per line ('-' for stdin)")
+    batch_parser.add_argument("-f", "--format", choices=["jsonl", "csv"], default="jsonl", help="output format (default: jsonl)")
+    batch_parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    batch_parser.add_argument("-w", "--workers", type=int, default=8, help="locations fetched at the same time (default: 8)")
+    batch_parser.add_argument("--season", choices=SEASONS, help="season used for clothing preferences (default: current season)")
+    batch_parser.add_argument("--preferences", metavar="DIR", help="folder holding clothing.json and ratings.json")
+    batch_parser.add_argument("--metrics", metavar="FILE", help="write per-stage latency statistics to FILE in Prometheus text format")
+    batch_parser.set_defaults(handler=batch)
+    history_parser = commands.add_parser("history", help="summarize the forecasts fetched so far")
+    history_parser.add_argument("--since", metavar="DATE", help="first day, e.g. 2025-11-01 (default: the first forecast stored)")
+    history_parser.add_argument("--until", metavar="DATE", help="last day, e.g. 2025-11-30 (default: the last forecast stored)")
+    history_parser.add_argument("--location", help="city name or 'lat, lon' pair (default: every location)")
+    history_parser.add_argument("--hourly", action="store_true", help="use hourly forecasts instead of 12-hour periods")
+    history_parser.add_argument("--factor", choices=["temperature", "wind", "chance"], default="temperature", help="value whose forecast changes are measured (default: temperature)")
+    history_parser.add_argument("--preferences", metavar="DIR", help="folder holding clothing.json and ratings.json")
+    history_parser.set_defaults(handler=history)
+    serve_parser = commands.add_parser("serve", help="serve reports as JSON over HTTP, sharing one cache between clients")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=8000, help="port to listen on (default: 8000)")
+    serve_parser.add_argument("-w", "--workers", type=int, default=16, help="locations fetched at the same time (default: 16)")
+    serve_parser.add_argument("--queue", type=int, default=64, help="fetches allowed to wait for a worker before requests are turned away (default: 64)")
+    serve_parser.add_argument("--preferences", metavar="DIR", help="folder holding the default clothing.json and ratings.json")
+    serve_parser.set_defaults(handler=serve)
+    return parser
+
+
+# Runs a command-line subcommand; returns the exit status
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    metrics.configure_from_environment()
+    if getattr(args, "metrics", None):
+        metrics.enable()
+    if getattr(args, "workers", 1) < 1:
+        print("--workers must be at least 1", file=sys.stderr)
+        return 1
+    return args.handler(args)
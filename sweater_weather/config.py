@@ -0,0 +1,46 @@
+import os
+
+
+# Folder for saved preferences and cached data; defaults to the folder containing sweater-weather.py
+APP_DIR = os.environ.get("SWEATER_WEATHER_HOME") or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Gets the full path of a file in the application folder
+def data_path(name):
+    return os.path.join(APP_DIR, name)
+
+
+# Replaces a file with `text` in one step: written to a temporary file of its own beside it, synced, then renamed over it
+# A crash cannot leave the file truncated, and threads or processes saving it at the same time cannot mix their writes
+def replace_file(path, text):
+    import tempfile  # Imported on first use to keep startup fast
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path), suffix=".tmp")
+    try:
+        with os.fdopen(handle, "w") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644  # mkstemp makes the file readable by its owner only
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+# Whether fetched forecasts are kept in the forecast history (see history.py)
+HISTORY = os.environ.get("SWEATER_WEATHER_HISTORY", "1") != "0"
+
+
+# Sweater Weather service (e.g. http://127.0.0.1:8000, see server.py) the window asks for reports instead of fetching forecasts itself
+SERVER_URL = os.environ.get("SWEATER_WEATHER_SERVER", "").rstrip("/")
+
+
+# Data source endpoints; can be pointed at a local stand-in server (see benchmarks/)
+NWS_URL = os.environ.get("SWEATER_WEATHER_NWS_URL", "https://api.weather.gov")
+IP_API_URL = os.environ.get("SWEATER_WEATHER_IP_API_URL", "http://ip-api.com/json/")
+NOMINATIM_URL = os.environ.get("SWEATER_WEATHER_NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
@@ -0,0 +1,146 @@
+import re
+from collections import namedtuple
+from datetime import datetime
+from sweater_weather import metrics, weather
+from sweater_weather.precipitation import get_classifier
+from sweater_weather.preferences import get_preferences_store
+from sweater_weather.rules import PRECIPITATION, rule_applies, uses_season
+
+
+# One forecast period that has at least one suggestion
+ReportRow = namedtuple("ReportRow", ["time", "temperature", "precipitation", "wind", "suggestions"])
+HEADER = "{0:<25}\t{1:<15}\t{2:<15}\t{3:<15}\t{4:<15}\t".format("Time", "Temp (F)", "Precipitation", "Wind (mph)", "Suggestions")
+NO_PREFERENCES = "No saved preferences. Set up preferences in the Settings tab."
+NO_SUGGESTIONS = "No suggestions for the coming week."
+
+
+# Raised when a location cannot be resolved
+class LocationError(Exception):
+    pass
+
+
+# Gets the season for a date (today by default)
+def get_season(date=None):
+    month = (date or datetime.now()).month
+    if 3 <= month <= 5:
+        return "spring"
+    elif 6 <= month <= 8:
+        return "summer"
+    elif 9 <= month <= 11:
+        return "autumn"
+    else:
+        return "winter"
+
+
+# Resolves a city name, or the current location when no city is given, to (lat, lon, label)
+def resolve_location(city_name=None):
+    if not city_name:
+        lat, lon, city, region = weather.fetch_current_location()
+        return lat, lon, f"{city}, {region}"
+    coordinates = weather.geocode_city(city_name)
+    if not coordinates:
+        raise LocationError(f"Could not find {city_name!r}.")
+    return coordinates[0], coordinates[1], city_name
+
+
+# Gets the 12-hour forecast periods for a coordinate pair
+def fetch_periods(lat, lon):
+    return weather.fetch_forecast(weather.fetch_forecast_url(lat, lon))['properties']['periods']
+
+
+# Reads one forecast period as (time, temperature, precipitation, wind, values), where values maps each factor
+# to the number the rules are matched against
+def period_values(p, classifier=None):
+    classifier = classifier or get_classifier()
+    time, temp, precip_fc, wind_fc = p["name"], int(p["temperature"]), p["detailedForecast"], p["windSpeed"]  # Get forecast value for each weather factor
+    precip, _ = classifier.classify(precip_fc)  # Determine precipitation based on keywords from the detailed forecast
+    wind = max(int(i) for i in re.findall(r'\d+', wind_fc))  # Extract max wind speed from forecasted range
+    chance = (p.get("probabilityOfPrecipitation") or {}).get("value")  # Newer forecasts give it as a number
+    hour = int(p["startTime"][11:13]) if p.get("startTime") else None  # Local hour the period starts, for time of day conditions
+    return time, temp, precip, wind, {"temperature": temp, "precipitation": PRECIPITATION.index(precip), "wind speed": wind, "precipitation chance": chance, "hour": hour}
+
+
+# Determines which user preferences are met by each forecast period
+# Yields a ReportRow for every period with at least one suggestion
+def report_rows(periods, engine=None, season=None):
+    engine = engine or get_preferences_store().engine()
+    season = season or get_season()
+    classifier = get_classifier()
+    for p in periods:
+        time, temp, precip, wind, values = period_values(p, classifier)
+        suggestions = engine.suggestions(season, values)  # Rating first, then clothing items
+        if suggestions:
+            yield ReportRow(time, temp, precip, wind, suggestions)
+
+
+# A forecast's periods, read and classified once, with the rules that apply to each kept from one report to the next
+# When the preferences or the season change, only the rules that are new, edited or depend on the season are checked again,
+# and only the periods those rules apply to (or used to) get their suggestions worked out again
+class PeriodReport:
+    def __init__(self, periods):
+        classifier = get_classifier()
+        self.periods = [period_values(p, classifier) for p in periods]
+        self.season = None  # Season the matches were worked out for
+        self.rules = {"clothing": (), "ratings": ()}  # Rules the matches were worked out for, in saved order without repeats
+        self.matches = {"clothing": [], "ratings": []}  # For each period, the set of rules that apply to it
+        self.suggestions = [None] * len(self.periods)  # For each period, its suggestions, or None to work them out again
+
+    # Brings the matches up to date with an engine's rules and a season
+    def update(self, engine, season):
+        for kind, rules in (("clothing", engine.clothing), ("ratings", engine.ratings)):
+            current = tuple(dict.fromkeys(rules))
+            kept = set(current) & set(self.rules[kind])
+            stale = set(current) - kept
+            if season != self.season:
+                stale |= {rule for rule in current if uses_season(rule)}
+            if [rule for rule in self.rules[kind] if rule in kept] != [rule for rule in current if rule in kept]:
+                self.suggestions = [None] * len(self.periods)  # Rules were reordered
+            if self.season is None or len(stale) > len(current) / 2:
+                # Mostly new rules; the engine's indexes check them all faster than one rule at a time
+                matching = engine.clothing_matches if kind == "clothing" else lambda season, values: engine.rating_matches(values, season)
+                self.matches[kind] = [{rules[i] for i in matching(season, values)} for *_, values in self.periods]
+                self.suggestions = [None] * len(self.periods)
+            else:
+                dropped = (set(self.rules[kind]) - kept) | stale
+                for i, (*_, values) in enumerate(self.periods):
+                    matches = self.matches[kind][i]
+                    before = len(matches)
+                    matches -= dropped
+                    remaining = len(matches)
+                    matches.update(rule for rule in stale if rule_applies(rule, values, season))
+                    if remaining != before or len(matches) != remaining:
+                        self.suggestions[i] = None
+            self.rules[kind] = current
+        self.season = season
+
+    # Yields a ReportRow for every period with at least one suggestion, as report_rows does
+    def rows(self, engine=None, season=None):
+        engine = engine or get_preferences_store().engine()
+        season = season or get_season()
+        self.update(engine, season)
+        rating_order = {rule: i for i, rule in enumerate(self.rules["ratings"])}
+        clothing_order = {rule: i for i, rule in enumerate(self.rules["clothing"])}
+        for i, (time, temp, precip, wind, _) in enumerate(self.periods):
+            suggestions = self.suggestions[i]
+            if suggestions is None:
+                ratings, clothing = self.matches["ratings"][i], self.matches["clothing"][i]
+                suggestions = [min(ratings, key=rating_order.get).rating] if ratings else []
+                for rule in sorted(clothing, key=clothing_order.get):
+                    if rule.clothing not in suggestions:
+                        suggestions.append(rule.clothing)
+                self.suggestions[i] = suggestions
+            if suggestions:
+                yield ReportRow(time, temp, precip, wind, list(suggestions))
+
+
+# Formats the report as tab-padded text; returns (header, report)
+def report(periods, engine=None, season=None):
+    engine = engine or get_preferences_store().engine()
+    if not engine.clothing and not engine.ratings:
+        return NO_PREFERENCES, None
+    with metrics.span("report"):
+        lines = ["{0:<25}\t{1:<15}\t{2:<15}\t{3:<15}\t".format(row.time, row.temperature, row.precipitation, row.wind) + ", ".join(row.suggestions) + "\n"
+                 for row in report_rows(periods, engine, season)]
+    if not lines:
+        return NO_SUGGESTIONS, ""
+    return HEADER, "".join(lines)
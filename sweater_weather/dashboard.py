@@ -0,0 +1,47 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sweater_weather import core, weather
+from sweater_weather.locations import get_locations_store
+from sweater_weather.preferences import get_preferences_store
+
+
+# Today's outlook for one location; grid is the NWS office and grid cell, e.g. "FWD/89,113"
+DashboardRow = namedtuple("DashboardRow", ["location", "period", "temperature", "precipitation", "wind", "rating", "clothing", "grid", "error"])
+MAX_WORKERS = 20  # Locations fetched at the same time, so a typical dashboard takes as long as its slowest location
+
+
+# Fetches and evaluates the first forecast period (today or tonight) of one location; never raises
+# Saved locations use their stored coordinates, other names are geocoded
+def dashboard_row(name, engine, season, store=None):
+    row = dict.fromkeys(DashboardRow._fields)
+    row.update(location=name, clothing=[])
+    try:
+        saved = (store or get_locations_store()).get(name)
+        lat, lon, label = (saved.lat, saved.lon, saved.name) if saved else core.resolve_location(name)
+        row["location"] = label
+        point = weather.fetch_point(lat, lon)
+        row["grid"] = f"{point['gridId']}/{point['gridX']},{point['gridY']}"
+        # Cities in the same grid cell share a forecast URL, which the HTTP client fetches only once
+        periods = weather.fetch_forecast(point['forecast'])['properties']['periods']
+        if periods:
+            time, temp, precip, wind, values = core.period_values(periods[0])
+            rating = engine.rating(values, season)
+            suggestions = engine.suggestions(season, values)
+            row.update(period=time, temperature=temp, precipitation=precip, wind=wind, rating=rating,
+                       clothing=suggestions[1:] if rating is not None else suggestions)
+    except Exception as e:
+        row["error"] = str(e) or type(e).__name__
+    return DashboardRow(**row)
+
+
+# Fetches every location at once; yields a DashboardRow for each as soon as it is ready
+def fetch_dashboard(names, engine=None, season=None, workers=MAX_WORKERS, store=None):
+    names = list(names)
+    if not names:
+        return
+    engine = engine or get_preferences_store().engine()
+    season = season or core.get_season()
+    with ThreadPoolExecutor(max_workers=min(workers, len(names))) as executor:
+        futures = [executor.submit(dashboard_row, name, engine, season, store) for name in names]
+        for future in as_completed(futures):
+            yield future.result()
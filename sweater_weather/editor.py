@@ -0,0 +1,323 @@
+import json
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTableView, QHeaderView, QAbstractItemView,
+    QStyledItemDelegate, QComboBox, QDoubleSpinBox, QFileDialog
+)
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from sweater_weather.preferences import (
+    KINDS, FACTOR_LIMITS, PreferencesError, check_rule, find_dead_rules, get_preferences_store, number, parse_rule,
+    read_rules_file, rule_entry, write_rules_file
+)
+from sweater_weather.rules import FACTORS, SEASONS, describe, parse_condition
+
+
+# Table editors for clothing and rating preferences
+# Only the cell being edited gets an editor widget, so opening a dialog takes the same time for 10 rules or 10,000
+
+
+# Column headers of each field
+HEADERS = {"season": "Season", "clothing": "Clothing", "rating": "Rating", "factor": "Weather Factor", "min": "Minimum", "max": "Maximum", "when": "Conditions"}
+SEASON_CHOICES = ["all seasons"] + SEASONS
+FACTOR_CHOICES = [""] + FACTORS  # "" leaves the rule to its conditions
+FACTOR_LABELS = {
+    "temperature": "Temperature (F)",
+    "precipitation": "Precipitation (0 = None, 1 = Rain, 2 = Snow, 3 = Mixed)",
+    "wind speed": "Wind Speed (mph)",
+    "precipitation chance": "Precipitation Chance (%)",
+    "wind gust": "Wind Gust (mph)",
+    "": "None (conditions only)",
+}
+NAME_FIELDS = {"clothing": "clothing", "ratings": "rating"}
+NAMES = {"clothing": "clothing item", "ratings": "rating"}  # What the name column holds, for messages
+INVALID = QColor("#F4CCCC")
+DEAD = QColor("#FCE5CD")  # Valid, but can never apply
+
+
+# Checks one rule dictionary; returns what is wrong with it, or None
+def validate(kind, entry):
+    name = entry.get(NAME_FIELDS[kind])
+    if not isinstance(name, str) or not name.strip():
+        return f"Enter a {NAMES[kind]}."
+    try:
+        check_rule(parse_rule(kind, entry))
+    except PreferencesError as e:
+        return str(e)
+    return None
+
+
+# The rules of one kind as a table, one row per rule; every row is validated as it changes
+class RulesModel(QAbstractTableModel):
+    def __init__(self, kind, entries=(), parent=None):
+        super().__init__(parent)
+        self.kind = kind
+        self.fields = KINDS[kind][1]._fields
+        self.entries = [dict(entry) for entry in entries]
+        self.errors = [validate(kind, entry) for entry in self.entries]  # Problem with each row, or None
+        self.dead = {}  # Row -> why it can never apply, as found when saving
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.fields)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        field = self.fields[index.column()]
+        value = self.entries[index.row()].get(field)
+        if role == Qt.DisplayRole:
+            if field == "season":
+                return str(value).title()
+            if field == "factor":
+                return FACTOR_LABELS.get(value, value)
+            if field == "when" and isinstance(value, dict):
+                try:
+                    return describe(parse_condition(value))
+                except ValueError:
+                    pass
+            return "" if value is None else json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+        if role == Qt.EditRole:
+            if field == "when":  # Edited as JSON text (see rules.parse_condition)
+                return value if isinstance(value, str) else json.dumps(value) if value else ""
+            return value
+        if role == Qt.BackgroundRole and (self.errors[index.row()] or index.row() in self.dead):
+            return INVALID if self.errors[index.row()] else DEAD
+        if role == Qt.ToolTipRole:
+            return self.errors[index.row()] or self.dead.get(index.row())
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return HEADERS[self.fields[section]]
+        return str(section + 1)
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        field = self.fields[index.column()]
+        row = index.row()
+        if field == "when":
+            try:
+                value = json.loads(value) if value.strip() else None
+            except ValueError:
+                pass  # Kept as typed, and reported as invalid
+        self.entries[row][field] = number(value) if field in ("min", "max") else value
+        self.errors[row] = validate(self.kind, self.entries[row])
+        self.mark_dead({})
+        # The whole row is redrawn, since its colour depends on every cell
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.fields) - 1))
+        return True
+
+    # Appends rule dictionaries
+    def append(self, entries):
+        entries = [dict(entry) for entry in entries]
+        if not entries:
+            return
+        self.mark_dead({})
+        self.beginInsertRows(QModelIndex(), len(self.entries), len(self.entries) + len(entries) - 1)
+        self.entries.extend(entries)
+        self.errors.extend(validate(self.kind, entry) for entry in entries)
+        self.endInsertRows()
+
+    # Removes rows by position
+    def remove(self, rows):
+        self.mark_dead({})
+        for row in sorted(set(rows), reverse=True):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.entries[row]
+            del self.errors[row]
+            self.endRemoveRows()
+
+    # Gets the positions of rows that cannot be saved
+    def invalid_rows(self):
+        return [row for row, error in enumerate(self.errors) if error]
+
+    # Highlights rows that can never apply, given as (row, reason) pairs; any change to the rules clears them
+    def mark_dead(self, dead):
+        if not dead and not self.dead:
+            return
+        self.dead = dict(dead)
+        self.dataChanged.emit(self.index(0, 0), self.index(len(self.entries) - 1, len(self.fields) - 1))
+
+
+# Edits a column through a dropdown of fixed choices, shown by label but stored by value
+class ChoiceDelegate(QStyledItemDelegate):
+    def __init__(self, choices, labels, parent=None):
+        super().__init__(parent)
+        self.choices = choices
+        self.labels = labels
+
+    def createEditor(self, parent, option, index):
+        editor = QComboBox(parent)
+        editor.addItems(self.labels)
+        return editor
+
+    def setEditorData(self, editor, index):
+        value = index.data(Qt.EditRole)
+        editor.setCurrentIndex(self.choices.index(value) if value in self.choices else 0)
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, self.choices[editor.currentIndex()])
+
+
+# Edits a minimum or maximum value, allowing decimals
+class NumberDelegate(QStyledItemDelegate):
+    def createEditor(self, parent, option, index):
+        editor = QDoubleSpinBox(parent)
+        editor.setDecimals(2)
+        editor.setRange(min(low for low, _ in FACTOR_LIMITS.values()), max(high for _, high in FACTOR_LIMITS.values()))
+        return editor
+
+    def setEditorData(self, editor, index):
+        value = index.data(Qt.EditRole)
+        editor.setValue(value if isinstance(value, (int, float)) else 0)
+
+    def setModelData(self, editor, model, index):
+        editor.interpretText()
+        model.setData(index, editor.value())
+
+
+# Window to view and change every clothing or rating preference
+# Rows with problems are highlighted and explained in place; Save is available once every row is valid
+class RulesEditor(QDialog):
+    def __init__(self, kind, entries=None, parent=None):
+        super().__init__(parent)
+        self.kind = kind
+        self.setWindowTitle("Clothing Preferences" if kind == "clothing" else "Rating Preferences")
+        self.resize(900, 500)
+        load_error = None
+        if entries is None:
+            try:
+                entries = [rule_entry(rule) for rule in get_preferences_store().rules_or_empty(kind)]
+            except (OSError, ValueError) as e:
+                entries, load_error = [], f"Unable to load saved preferences: {e}"
+        self.model = RulesModel(kind, entries, self)
+        self.warned = False  # Whether the rows that can never apply have been pointed out since the last change
+        layout = QVBoxLayout()
+        # Rules table
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.view.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed | QAbstractItemView.AnyKeyPressed)
+        # Fixed row heights and column widths, so the view never measures every row
+        self.view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.view.horizontalHeader().setStretchLastSection(True)
+        fields = self.model.fields
+        for column, field in enumerate(fields):
+            self.view.setColumnWidth(column, 320 if field == "factor" else 120 if field in ("season", "min", "max") else 200)
+        self.view.setItemDelegateForColumn(fields.index("factor"), ChoiceDelegate(FACTOR_CHOICES, [FACTOR_LABELS[f] for f in FACTOR_CHOICES], self.view))
+        if "season" in fields:
+            self.view.setItemDelegateForColumn(fields.index("season"), ChoiceDelegate(SEASON_CHOICES, [s.title() for s in SEASON_CHOICES], self.view))
+        numbers = NumberDelegate(self.view)
+        self.view.setItemDelegateForColumn(fields.index("min"), numbers)
+        self.view.setItemDelegateForColumn(fields.index("max"), numbers)
+        layout.addWidget(self.view)
+        tools = QHBoxLayout()  # Editing row
+        # Add button
+        add_btn = QPushButton("Add Rule")
+        add_btn.clicked.connect(self.add_rule)
+        tools.addWidget(add_btn)
+        # Remove button
+        remove_btn = QPushButton("Remove Selected")
+        remove_btn.clicked.connect(self.remove_selected)
+        tools.addWidget(remove_btn)
+        # Import and export buttons
+        import_btn = QPushButton("Import...")
+        import_btn.clicked.connect(self.import_rules)
+        tools.addWidget(import_btn)
+        export_btn = QPushButton("Export...")
+        export_btn.clicked.connect(self.export_rules)
+        tools.addWidget(export_btn)
+        layout.addLayout(tools)
+        # Validation status
+        self.status = QLabel()
+        self.status.setWordWrap(True)
+        layout.addWidget(self.status)
+        buttons = QHBoxLayout()  # Menu row
+        # Save button
+        self.save_btn = QPushButton("Save")
+        self.save_btn.clicked.connect(self.save)
+        buttons.addWidget(self.save_btn)
+        # Cancel button
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self.reject)
+        buttons.addWidget(self.cancel_btn)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+        self.model.dataChanged.connect(self.update_status)
+        self.model.rowsInserted.connect(self.update_status)
+        self.model.rowsRemoved.connect(self.update_status)
+        self.update_status()
+        if load_error:
+            self.status.setText(load_error)
+
+    # Shows the first problem, if any, and allows saving only when there are none
+    def update_status(self, *args):
+        self.warned = False
+        invalid = self.model.invalid_rows()
+        self.save_btn.setEnabled(not invalid)
+        if invalid:
+            more = f" ({len(invalid) - 1} more rows need fixing)" if len(invalid) > 1 else ""
+            self.status.setText(f"<font color='#B00020'>Row {invalid[0] + 1}: {self.model.errors[invalid[0]]}{more}</font>")
+        else:
+            self.status.setText(f"{len(self.model.entries)} rules.")
+
+    # Adds a blank rule at the end and starts editing its name
+    def add_rule(self):
+        entry = {"season": "all seasons", "clothing": "", "rating": "", "factor": "temperature", "min": 0, "max": 0, "when": None}
+        self.model.append([{field: entry[field] for field in self.model.fields}])
+        index = self.model.index(len(self.model.entries) - 1, self.model.fields.index(NAME_FIELDS[self.kind]))
+        self.view.scrollTo(index)
+        self.view.setCurrentIndex(index)
+        self.view.edit(index)
+
+    def remove_selected(self):
+        self.model.remove(index.row() for index in self.view.selectionModel().selectedRows())
+
+    # Adds the rules from a JSON or CSV file
+    def import_rules(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import Preferences", "", "Preferences (*.json *.csv)")
+        if not path:
+            return
+        try:
+            self.model.append(read_rules_file(self.kind, path))
+        except (OSError, ValueError) as e:
+            self.status.setText(f"Unable to import {path}: {e}")
+
+    # Writes the rules in the table, as JSON or CSV depending on the file name
+    def export_rules(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Preferences", "", "JSON (*.json);;CSV (*.csv)")
+        if not path:
+            return
+        try:
+            write_rules_file(self.kind, path, self.model.entries)
+            self.status.setText(f"Exported {len(self.model.entries)} rules to {path}.")
+        except OSError as e:
+            self.status.setText(f"Unable to export to {path}: {e}")
+
+    # Saves the rules and closes the window
+    # Rules that can never apply are pointed out first; clicking Save again keeps them anyway
+    def save(self):
+        if not self.warned:
+            dead = find_dead_rules(self.kind, [parse_rule(self.kind, entry) for entry in self.model.entries])
+            if dead:
+                self.model.mark_dead(dead)
+                self.warned = True
+                row, reason = dead[0]
+                more = f" ({len(dead) - 1} more rows never apply)" if len(dead) > 1 else ""
+                self.status.setText(f"Row {row + 1} can never apply: {reason}.{more} Change it, or click Save again to keep it anyway.")
+                self.view.scrollTo(self.model.index(row, 0))
+                return
+        try:
+            get_preferences_store().save(self.kind, self.model.entries)
+        except (OSError, ValueError) as e:
+            self.status.setText(f"Error saving preferences: {e}")
+            return
+        self.accept()
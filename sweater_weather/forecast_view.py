@@ -0,0 +1,131 @@
+from PyQt5.QtWidgets import QTableView, QHeaderView, QAbstractItemView
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QTimer, pyqtSignal
+
+
+# Forecast report shown as a table, filled a batch of rows at a time from a generator of core.ReportRow
+# so the window keeps responding while long reports (e.g. a week of hours) are evaluated
+
+
+COLUMNS = ["Time", "Temp (F)", "Precipitation", "Wind (mph)", "Suggestions"]
+BATCH = 64  # Rows evaluated and added per event loop turn
+TRANSITION = QColor("#FFF2CC")
+
+
+# Report rows in the order they were produced; a row whose suggestions differ from the row before it is a transition
+class ForecastModel(QAbstractTableModel):
+    finished = pyqtSignal(int)  # Number of rows, once the rows being streamed have all been added
+    failed = pyqtSignal(str)  # Error raised while producing rows; the rows added before it are kept
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.transitions = []
+        self.source = None  # Iterator still being streamed
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.add_batch)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            return ", ".join(row.suggestions) if column == 4 else str(row[column])
+        if role == Qt.EditRole:
+            # Sort key: time sorts in forecast order, numbers as numbers
+            return index.row() if column == 0 else ", ".join(row.suggestions) if column == 4 else row[column]
+        if role == Qt.BackgroundRole and self.transitions[index.row()]:
+            return TRANSITION
+        if role == Qt.ToolTipRole and self.transitions[index.row()]:
+            return "Suggestions change here."
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    # Removes every row and stops any stream in progress
+    def clear(self):
+        self.timer.stop()
+        self.source = None
+        self.beginResetModel()
+        self.rows = []
+        self.transitions = []
+        self.endResetModel()
+
+    # Replaces the rows with those of a generator, added a batch at a time from the event loop
+    def stream(self, rows):
+        self.clear()
+        self.source = iter(rows)
+        self.add_batch()
+        if self.source is not None:
+            self.timer.start(0)
+
+    # Replaces the rows with those of a generator all at once, keeping the table's sort order
+    def replace(self, rows):
+        self.timer.stop()
+        self.source = None
+        rows = list(rows)
+        self.beginResetModel()
+        self.rows = rows
+        self.transitions = [i > 0 and row.suggestions != rows[i - 1].suggestions for i, row in enumerate(rows)]
+        self.endResetModel()
+        self.finished.emit(len(self.rows))
+
+    # Whether rows are still being added
+    def streaming(self):
+        return self.source is not None
+
+    def add_batch(self):
+        batch = []
+        error = None
+        try:
+            for row in self.source:
+                batch.append(row)
+                if len(batch) == BATCH:
+                    break
+            else:
+                self.source = None
+        except Exception as e:
+            self.source, error = None, e
+        if self.source is None:
+            self.timer.stop()
+        if batch:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(batch) - 1)
+            for row in batch:
+                self.transitions.append(bool(self.rows) and row.suggestions != self.rows[-1].suggestions)
+                self.rows.append(row)
+            self.endInsertRows()
+        if error is not None:
+            self.failed.emit(str(error))
+        elif self.source is None:
+            self.finished.emit(len(self.rows))
+
+
+# Sortable, resizable table over a ForecastModel
+class ForecastTable(QTableView):
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        proxy = QSortFilterProxyModel(self)
+        proxy.setSourceModel(model)
+        proxy.setSortRole(Qt.EditRole)
+        self.setModel(proxy)
+        self.setSortingEnabled(True)
+        self.sortByColumn(-1, Qt.AscendingOrder)  # Forecast order until a header is clicked
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.verticalHeader().setVisible(False)
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)  # No per-row measuring, so long reports stay cheap
+        header = self.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setStretchLastSection(True)
+        for column, width in enumerate((110, 70, 100, 80)):
+            self.setColumnWidth(column, width)
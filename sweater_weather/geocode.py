@@ -0,0 +1,124 @@
+import bisect
+import csv
+import json
+import os
+import re
+import threading
+import time
+from sweater_weather.config import data_path, replace_file
+
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.csv")
+STATES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca",
+    "colorado": "co", "connecticut": "ct", "delaware": "de", "district of columbia": "dc",
+    "florida": "fl", "georgia": "ga", "hawaii": "hi", "idaho": "id", "illinois": "il",
+    "indiana": "in", "iowa": "ia", "kansas": "ks", "kentucky": "ky", "louisiana": "la",
+    "maine": "me", "maryland": "md", "massachusetts": "ma", "michigan": "mi", "minnesota": "mn",
+    "mississippi": "ms", "missouri": "mo", "montana": "mt", "nebraska": "ne", "nevada": "nv",
+    "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm", "new york": "ny",
+    "north carolina": "nc", "north dakota": "nd", "ohio": "oh", "oklahoma": "ok", "oregon": "or",
+    "pennsylvania": "pa", "puerto rico": "pr", "rhode island": "ri", "south carolina": "sc",
+    "south dakota": "sd", "tennessee": "tn", "texas": "tx", "utah": "ut", "vermont": "vt",
+    "virginia": "va", "washington": "wa", "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy",
+}
+COUNTRIES = {"us", "usa", "united states", "united states of america"}
+PUNCTUATION = re.compile(r"[^\w\s,]")
+
+
+# Reduces a place name to its index key, e.g. " Richardson,  Texas, USA" -> "richardson tx"
+def normalize_query(text):
+    parts = [" ".join(PUNCTUATION.sub(" ", part).split()) for part in text.lower().split(",")]
+    parts = [part for part in parts if part]
+    if len(parts) > 1 and parts[-1] in COUNTRIES:
+        parts.pop()
+    tokens = " ".join(parts).split()
+    # Abbreviate a trailing state name, but only after a city name ("washington" alone is a city)
+    for n in (3, 2, 1):
+        if len(tokens) > n and " ".join(tokens[-n:]) in STATES:
+            tokens = tokens[:-n] + [STATES[" ".join(tokens[-n:])]]
+            break
+    return " ".join(tokens)
+
+
+# Persistent geocode index keyed by normalized query, seeded from the bundled gazetteer
+class GeocodeIndex:
+    def __init__(self, path=None, gazetteer_path=GAZETTEER_PATH):
+        self.path = path or data_path("geocode.json")
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.saved = {}  # Entries learned from the network, written to self.path
+        if gazetteer_path:
+            self.load_gazetteer(gazetteer_path)
+        try:
+            with open(self.path, "r") as file:
+                self.saved = json.load(file)
+            self.entries.update(self.saved)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError):
+            self.saved = {}  # Unreadable index; it is rebuilt as lookups are made
+        self.keys = sorted(self.entries)
+
+    # Adds every city in a city,state,lat,lon CSV under "city st", and under "city" alone when no other state has that name
+    # (a bare "Springfield" is left to Nominatim rather than guessing a state)
+    def load_gazetteer(self, path):
+        names = {}
+        with open(path, "r", newline="") as file:
+            for row in csv.DictReader(file):
+                label = f"{row['city']}, {row['state']}"
+                entry = {"lat": float(row["lat"]), "lon": float(row["lon"]), "display_name": label, "label": label, "timestamp": 0}
+                self.entries[normalize_query(label)] = entry
+                names.setdefault(normalize_query(row["city"]), []).append(entry)
+        for name, entries in names.items():
+            if len(entries) == 1:
+                self.entries.setdefault(name, entries[0])
+
+    # Gets the stored entry for a query, or None
+    def lookup(self, query):
+        return self.entries.get(normalize_query(query))
+
+    # Stores a geocoding result and saves the index
+    def add(self, query, lat, lon, display_name):
+        key = normalize_query(query)
+        if not key:
+            return
+        entry = {"lat": lat, "lon": lon, "display_name": display_name, "label": " ".join(query.split()), "timestamp": time.time()}
+        with self.lock:
+            if key not in self.entries:
+                bisect.insort(self.keys, key)
+            self.entries[key] = entry
+            self.saved[key] = entry
+            self.save()
+
+    # Writes learned entries to disk (lock must be held)
+    def save(self):
+        replace_file(self.path, json.dumps(self.saved))
+
+    # Gets labels of entries whose key starts with the normalized prefix, for autocomplete
+    def complete(self, prefix, limit=10):
+        key = normalize_query(prefix)
+        if not key:
+            return []
+        labels = []
+        with self.lock:
+            i = bisect.bisect_left(self.keys, key)
+            while i < len(self.keys) and self.keys[i].startswith(key) and len(labels) < limit:
+                label = self.entries[self.keys[i]]["label"]
+                if label not in labels:
+                    labels.append(label)
+                i += 1
+        return labels
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+# Gets the shared geocode index, loading it on first use
+def get_geocode_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = GeocodeIndex()
+        return _index
@@ -0,0 +1,160 @@
+import json
+import math
+import re
+import threading
+import time
+from sweater_weather.config import data_path, replace_file
+
+
+# Spatial index over the NWS grid cells seen so far, so coordinates inside a known cell need no /points request
+# IP geolocation and Nominatim return slightly different coordinates on every call, but a grid cell is about 2.5 km across
+# Each cell keeps its /points metadata and, once a forecast for it has been fetched, its outline (the forecast's polygon)
+# Cells are found through geohash-style buckets: the map is split into squares of BUCKET degrees (about 4.9 km)
+# and each cell is listed under every square its outline overlaps
+BUCKET = 360 / 2 ** 13  # Longitude width of a 5-character geohash; latitude uses the same step
+MAX_AGE = 30 * 24 * 60 * 60  # Cell metadata older than this is fetched again
+NEAREST_RADIUS = 100  # Kilometres searched for nearby places
+EARTH_RADIUS = 6371.0
+GRID_URL = re.compile(r"/gridpoints/([A-Z]{3}/\d+,\d+)(?:/forecast(?:/hourly)?)?/?$")
+
+
+# Gets the bucket containing a coordinate pair
+def bucket(lat, lon):
+    return math.floor((lat + 90) / BUCKET), math.floor((lon + 180) / BUCKET)
+
+
+# Gets the distance between two coordinate pairs in kilometres
+def distance(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+# Whether a point is inside a polygon ring of [lon, lat] pairs (ray casting)
+def inside(lat, lon, ring):
+    result = False
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        if (y1 > lat) != (y2 > lat) and lon < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+            result = not result
+    return result
+
+
+# Gets the grid cell name (e.g. "FWD/89,113") of /points metadata
+def cell_name(point):
+    return f"{point['gridId']}/{point['gridX']},{point['gridY']}"
+
+
+# Persistent index of grid cells, saved in gridcells.json
+class GridIndex:
+    def __init__(self, path=None):
+        self.path = path or data_path("gridcells.json")
+        self.lock = threading.Lock()
+        self.cells = {}  # Cell name -> {"point": /points properties, "polygon": [[lon, lat], ...] or None, "updated": timestamp}
+        self.buckets = {}  # Bucket -> names of cells whose outline overlaps it
+        self.places = {}  # Bucket -> [(label, lat, lon)] of the towns NWS names as cells' nearest place
+        try:
+            with open(self.path, "r") as file:
+                self.cells = json.load(file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError):
+            self.cells = {}  # Unreadable index; it is rebuilt as points are fetched
+        for name, cell in self.cells.items():
+            self.add_to_buckets(name, cell)
+
+    # Lists a cell under the buckets its outline overlaps, and its nearest place under the place's bucket (lock must be held)
+    def add_to_buckets(self, name, cell):
+        if cell.get("polygon"):
+            lons = [lon for lon, _ in cell["polygon"]]
+            lats = [lat for _, lat in cell["polygon"]]
+            (low_lat, low_lon), (high_lat, high_lon) = bucket(min(lats), min(lons)), bucket(max(lats), max(lons))
+            for i in range(low_lat, high_lat + 1):
+                for j in range(low_lon, high_lon + 1):
+                    names = self.buckets.setdefault((i, j), [])
+                    if name not in names:
+                        names.append(name)
+        place = cell["point"].get("relativeLocation") or {}
+        coordinates = (place.get("geometry") or {}).get("coordinates")
+        city, state = (place.get("properties") or {}).get("city"), (place.get("properties") or {}).get("state")
+        if coordinates and city:
+            label = f"{city}, {state}" if state else city
+            places = self.places.setdefault(bucket(coordinates[1], coordinates[0]), [])
+            if all(existing != label for existing, _, _ in places):
+                places.append((label, coordinates[1], coordinates[0]))
+
+    # Gets the /points metadata of the known grid cell containing a coordinate pair, or None
+    # Only cells whose outline is known and whose metadata is recent enough are used
+    def lookup(self, lat, lon):
+        now = time.time()
+        with self.lock:
+            for name in self.buckets.get(bucket(lat, lon), ()):
+                cell = self.cells[name]
+                if now - cell["updated"] < MAX_AGE and inside(lat, lon, cell["polygon"]):
+                    return cell["point"]
+        return None
+
+    # Stores the /points metadata of a cell
+    def add_point(self, point):
+        name = cell_name(point)
+        with self.lock:
+            cell = self.cells.get(name)
+            if cell and cell["point"].get("forecast") == point.get("forecast") and time.time() - cell["updated"] < MAX_AGE / 2:
+                return  # Nothing new
+            cell = {"point": point, "polygon": cell["polygon"] if cell else None, "updated": time.time()}
+            self.cells[name] = cell
+            self.add_to_buckets(name, cell)
+            self.save()
+
+    # Stores the outline of a cell from a forecast or gridpoint response (its URL and GeoJSON geometry)
+    # Outlines of cells whose /points metadata is not known yet are ignored
+    def add_outline(self, url, geometry):
+        match = GRID_URL.search(url)
+        if not match or not geometry or geometry.get("type") != "Polygon":
+            return
+        ring = [[float(lon), float(lat)] for lon, lat in geometry["coordinates"][0]]
+        if ring and ring[0] == ring[-1]:
+            ring.pop()  # GeoJSON repeats the first corner at the end
+        with self.lock:
+            cell = self.cells.get(match.group(1))
+            if cell is None or cell["polygon"] == ring or len(ring) < 3:
+                return
+            cell["polygon"] = ring
+            self.add_to_buckets(match.group(1), cell)
+            self.save()
+
+    # Gets up to `limit` (label, distance in km) of the known places nearest to a coordinate pair, closest first
+    # Buckets are searched in growing squares around the point, stopping once no closer place can be found
+    def nearest(self, lat, lon, limit=5, radius=NEAREST_RADIUS):
+        center_i, center_j = bucket(lat, lon)
+        step = BUCKET * 111 * math.cos(math.radians(lat))  # Narrowest width of a bucket in km, east to west
+        found = []
+        with self.lock:
+            for ring in range(int(radius / step) + 2):
+                for i in range(center_i - ring, center_i + ring + 1):
+                    # Only the edge of the square; its inside was searched in earlier rounds
+                    edge = range(center_j - ring, center_j + ring + 1) if abs(i - center_i) == ring else {center_j - ring, center_j + ring}
+                    for j in edge:
+                        for label, place_lat, place_lon in self.places.get((i, j), ()):
+                            found.append((distance(lat, lon, place_lat, place_lon), label))
+                # Places in later squares are at least `ring` buckets away
+                found.sort()
+                if len(found) >= limit and found[limit - 1][0] <= ring * step:
+                    break
+        return [(label, km) for km, label in found[:limit] if km <= radius]
+
+    # Writes the index to disk (lock must be held)
+    def save(self):
+        replace_file(self.path, json.dumps(self.cells))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+# Gets the shared grid cell index, loading it on first use
+def get_grid_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = GridIndex()
+        return _index
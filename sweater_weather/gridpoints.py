@@ -0,0 +1,107 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+import numpy as np
+
+
+# Decodes NWS raw gridpoint data (/gridpoints/{wfo}/{x},{y}) into hour-aligned NumPy arrays
+# Each layer is a list of {"validTime": "2024-10-18T12:00:00+00:00/PT3H", "value": ...} entries in its own unit
+HOUR = 3600
+# Gridpoint layer -> (factor name, whether the value is an amount over the whole interval)
+LAYERS = {
+    "temperature": ("temperature", False),
+    "windSpeed": ("wind speed", False),
+    "windGust": ("wind gust", False),
+    "probabilityOfPrecipitation": ("precipitation chance", False),
+    "quantitativePrecipitation": ("rain amount", True),
+    "snowfallAmount": ("snow amount", True),
+}
+# Converts values to the units rules use: degrees F, mph, percent and inches
+CONVERSIONS = {
+    "wmoUnit:degC": lambda v: v * 9 / 5 + 32,
+    "wmoUnit:km_h-1": lambda v: v / 1.609344,
+    "wmoUnit:m_s-1": lambda v: v * 2.236936,
+    "wmoUnit:mm": lambda v: v / 25.4,
+}
+DURATION = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+SNOW_RATIO = 10  # Inches of snow per inch of water, for telling rain from snow in the precipitation amount
+TRACE = 0.001  # Inches per hour below which an amount is treated as none
+
+
+# Reads an ISO 8601 duration such as "PT1H" or "P1DT6H" as whole hours, rounding partial hours up
+# A forecast uses only a handful of distinct durations, so each is parsed once
+@lru_cache(maxsize=256)
+def parse_duration(text):
+    match = DURATION.match(text)
+    if not match:
+        raise ValueError(f"Unsupported duration {text!r}")
+    days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return max(1, days * 24 + hours + (minutes * 60 + seconds + HOUR - 1) // HOUR)
+
+
+# Reads ISO 8601 start times as Unix timestamps
+# NWS sends UTC times, which NumPy parses in one call once the "+00:00" is dropped
+def parse_times(texts):
+    if all(text.endswith("+00:00") for text in texts):
+        return np.array([text[:-6] for text in texts], dtype="datetime64[s]").astype(np.int64)
+    return np.fromiter((int(datetime.fromisoformat(text).timestamp()) for text in texts), dtype=np.int64, count=len(texts))
+
+
+# Reads one layer as parallel arrays (starts, hours, values), converted to the rules' units; missing values are NaN
+def decode_layer(layer):
+    entries = (layer or {}).get("values") or []
+    intervals = [entry["validTime"].partition("/") for entry in entries]
+    starts = parse_times([start for start, _, _ in intervals])
+    hours = np.fromiter((parse_duration(duration) for _, _, duration in intervals), dtype=np.int64, count=len(entries))
+    values = np.array([entry["value"] for entry in entries], dtype=np.float64)  # None becomes NaN
+    convert = CONVERSIONS.get((layer or {}).get("uom"))
+    return starts, hours, convert(values) if convert else values
+
+
+# Spreads intervals over an hourly axis of n hours starting at `start`; amounts are divided evenly between their hours
+def expand(starts, hours, values, start, n, amount=False):
+    out = np.full(n, np.nan, dtype=np.float32)
+    if not len(starts):
+        return out
+    if amount:
+        values = values / hours
+    total = int(hours.sum())
+    # Position of every hour of every interval: the interval's offset plus the hour's place within it
+    within = np.arange(total) - np.repeat(np.cumsum(hours) - hours, hours)
+    index = np.repeat((starts - start) // HOUR, hours) + within
+    keep = (index >= 0) & (index < n)
+    out[index[keep]] = np.repeat(values, hours)[keep]
+    return out
+
+
+# Gridpoint layers as float32 arrays over one shared hourly axis, keyed by factor name
+# Hours a layer does not cover are NaN, which no rule range matches
+class GridSeries:
+    def __init__(self, properties, timezone=None):
+        self.timezone = timezone  # IANA name from the point metadata, for showing local times
+        decoded = {factor: (decode_layer(properties.get(layer)), amount) for layer, (factor, amount) in LAYERS.items()}
+        firsts = [starts.min() for (starts, _, _), _ in decoded.values() if len(starts)]
+        lasts = [(starts + hours * HOUR).max() for (starts, hours, _), _ in decoded.values() if len(starts)]
+        self.start = int(min(firsts)) // HOUR * HOUR if firsts else 0
+        n = (int(max(lasts)) - self.start + HOUR - 1) // HOUR if lasts else 0
+        self.values = {factor: expand(*arrays, self.start, n, amount) for factor, (arrays, amount) in decoded.items()}
+        for factor, (_, amount) in decoded.items():
+            if not amount:
+                np.round(self.values[factor], out=self.values[factor])  # Whole degrees, mph and percent, like the text forecast
+        self.values["precipitation"] = precipitation_codes(self.values["rain amount"], self.values["snow amount"])
+
+    def __len__(self):
+        return len(self.values["temperature"])
+
+    # Gets the start of every hour as Unix timestamps
+    def times(self):
+        return self.start + HOUR * np.arange(len(self), dtype=np.int64)
+
+
+# Works out precipitation codes (see rules.PRECIPITATION) from hourly water and snow amounts in inches
+# Water beyond what the snow accounts for is rain; both together are "Mixed"
+def precipitation_codes(rain_amount, snow_amount):
+    snow_amount = np.nan_to_num(snow_amount)
+    snow = snow_amount > TRACE
+    rain = np.nan_to_num(rain_amount) - snow_amount / SNOW_RATIO > TRACE
+    return np.where(rain & snow, 3, np.where(snow, 2, np.where(rain, 1, 0))).astype(np.int8)
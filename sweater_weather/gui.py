@@ -0,0 +1,645 @@
+import json
+import time
+from PyQt5.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QPushButton, QLabel,
+    QLineEdit, QCheckBox, QTabWidget, QMessageBox, QHBoxLayout, QCompleter,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+)
+from PyQt5.QtGui import QPalette, QLinearGradient, QColor, QBrush
+from PyQt5.QtCore import Qt, QThreadPool, QStringListModel, QTimer, pyqtSignal
+from sweater_weather import core, metrics
+from sweater_weather.config import SERVER_URL, data_path
+from sweater_weather.forecast_view import ForecastModel, ForecastTable
+from sweater_weather.geocode import get_geocode_index, normalize_query
+from sweater_weather.grid_index import get_grid_index
+from sweater_weather.locations import get_locations_store
+from sweater_weather.preferences import get_preferences_store
+from sweater_weather.rules import describe, rule_condition
+from sweater_weather.scheduler import RefreshScheduler, is_stale
+from sweater_weather.splash import show_splash
+from sweater_weather.worker import DashboardWorker, ForecastWorker
+
+
+DISPLAY_LIMIT = 20  # Saved preferences listed in the Settings tab; the editors show them all
+SEASON_CHECK_MS = 10 * 60 * 1000
+DASHBOARD_COLUMNS = ["Location", "Period", "Temp (F)", "Precipitation", "Wind (mph)", "Rating", "Clothing", "NWS Grid"]
+
+
+# Opens a new dialog showing an error message
+def error_message(message):
+    msg_box = QMessageBox()
+    msg_box.setWindowTitle("Error")
+    msg_box.setIcon(QMessageBox.Critical)
+    msg_box.setText(message)
+    msg_box.setStandardButtons(QMessageBox.Ok)
+    msg_box.exec_()
+
+
+# Opens a new dialog showing a task success message
+def success_message(message):
+    msg_box = QMessageBox()
+    msg_box.setWindowTitle("Success")
+    msg_box.setIcon(QMessageBox.Information)
+    msg_box.setText(message)
+    msg_box.setStandardButtons(QMessageBox.Ok)
+    msg_box.exec_()
+
+
+# Main application
+class SweaterWeatherApp(QMainWindow):
+    snapshot_refreshed = pyqtSignal(str)  # Location key; emitted from the scheduler's threads and handled on the UI thread
+    preferences_changed = pyqtSignal(str)  # Kind; files changed on disk are noticed on whichever thread reads them
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Sweater Weather")
+        self.setGeometry(500, 200, 0, 0)
+        self.current_season = self.get_season()
+        get_preferences_store().subscribe(self.preferences_changed.emit)
+        self.preferences_changed.connect(self.on_preferences_changed)
+        self.fetch_job = 0  # Id of the most recent fetch; results from older fetches are ignored
+        self.active_worker = None
+        self.shown = None  # (location name or None, hourly) of the scheduler snapshot on screen
+        self.last_location = None  # (label, lat, lon) of the last city shown, for Save Location
+        self.last_coordinates = None  # (lat, lon) of the last forecast shown, current location included, for nearby places
+        self.report_hourly = False  # Whether the report on screen is hour by hour
+        self.report_source = None  # core.PeriodReport or hourly.HourlyForecast on screen, kept to redo the report without fetching
+        self.initUI()
+        # Notice the season changing while the window stays open
+        self.season_timer = QTimer(self)
+        self.season_timer.timeout.connect(self.check_season)
+        self.season_timer.start(SEASON_CHECK_MS)
+        # Keep saved locations fresh in the background, starting once the window is up
+        self.scheduler = RefreshScheduler()
+        self.scheduler.subscribe(self.snapshot_refreshed.emit)
+        self.snapshot_refreshed.connect(self.on_snapshot_refreshed)
+        get_locations_store().subscribe(self.update_save_button)
+        if not SERVER_URL:  # A Sweater Weather service keeps forecasts fresh for its clients
+            QTimer.singleShot(0, self.scheduler.start)
+
+    def closeEvent(self, event):
+        self.scheduler.stop()
+        super().closeEvent(event)
+
+    def get_season(self):
+        return core.get_season()
+
+    def initUI(self):
+        self.tabs = QTabWidget()
+        self.apply_seasonal_theme()
+        # Home tab
+        self.home_tab = self.create_home_tab()
+        self.tabs.addTab(self.home_tab, "Home")
+        # Dashboard tab, fetched the first time it is opened
+        self.dashboard_tab = self.create_dashboard_tab()
+        self.dashboard_loaded = False
+        self.tabs.addTab(self.dashboard_tab, "Dashboard")
+        # Settings tab, built the first time it is opened so startup does not wait on the preference files
+        self.settings_tab = QWidget()
+        self.settings_tab.setLayout(QVBoxLayout())
+        self.settings_tab.layout().setContentsMargins(0, 0, 0, 0)
+        self.settings_built = False
+        self.tabs.addTab(self.settings_tab, "Settings")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+        self.setCentralWidget(self.tabs)
+
+    # Builds the Settings tab, and fetches the dashboard, on first open
+    def on_tab_changed(self, index):
+        if self.tabs.widget(index) is self.settings_tab and not self.settings_built:
+            self.settings_built = True
+            self.settings_tab.layout().addWidget(self.create_settings_tab())
+        elif self.tabs.widget(index) is self.dashboard_tab and not self.dashboard_loaded:
+            self.dashboard_loaded = True
+            self.refresh_dashboard()
+
+    # Changes color of UI based on the current season
+    def apply_seasonal_theme(self):
+        palette = QPalette()
+        if self.current_season == "spring":
+            gradient = QLinearGradient(0, 0, 1, 1)
+            gradient.setColorAt(0, QColor("#A7D3A6"))
+            gradient.setColorAt(1, QColor("#FFC0CB"))
+        elif self.current_season == "summer":
+            gradient = QLinearGradient(0, 0, 1, 1)
+            gradient.setColorAt(0, QColor("#FFD700"))
+            gradient.setColorAt(1, QColor("#87CEEB"))
+        elif self.current_season == "autumn":
+            gradient = QLinearGradient(0, 0, 1, 1)
+            gradient.setColorAt(0, QColor("#FF7F50"))
+            gradient.setColorAt(1, QColor("#8B4513"))
+        else:
+            gradient = QLinearGradient(0, 0, 1, 1)
+            gradient.setColorAt(0, QColor("#B0E0E6"))
+            gradient.setColorAt(1, QColor("#FFFFFF"))
+        palette.setBrush(QPalette.Window, QBrush(gradient))
+        self.setPalette(palette)
+
+    # Home tab UI
+    def create_home_tab(self):
+        tab = QWidget()
+        layout = QVBoxLayout()
+        # Welcome message
+        welcome_label = QLabel("<b>Welcome to Sweater Weather!</b>")
+        welcome_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(welcome_label)
+        # Display season
+        self.season_label = QLabel(f"Theme: {self.current_season.title()}")
+        self.season_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.season_label)
+        # Location name input
+        self.location_input = QLineEdit()
+        self.location_input.setPlaceholderText("Enter City Name (e.g., Richardson, TX)")
+        # Autocomplete from known cities
+        self.location_matches = QStringListModel()
+        completer = QCompleter(self.location_matches, self)
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)  # Matches are already filtered by the index
+        self.location_input.setCompleter(completer)
+        self.location_input.textEdited.connect(self.update_location_matches)
+        self.location_input.textChanged.connect(self.update_save_button)
+        layout.addWidget(self.location_input)
+        # Use Current Location checkbox
+        self.use_current_location = QCheckBox("Use My Current Location")
+        self.use_current_location.stateChanged.connect(self.toggle_location_input)
+        layout.addWidget(self.use_current_location)
+        # Hourly forecast checkbox
+        self.use_hourly = QCheckBox("Hourly Forecast")
+        layout.addWidget(self.use_hourly)
+        # Grid data checkbox: hourly values decoded from the NWS numeric time series, including gusts
+        self.use_grid = QCheckBox("Use NWS Grid Data (adds wind gusts)")
+        self.use_grid.setEnabled(False)
+        self.use_hourly.stateChanged.connect(lambda state: self.use_grid.setEnabled(state == Qt.Checked))
+        layout.addWidget(self.use_grid)
+        buttons = QHBoxLayout()  # Fetch controls row
+        # Fetch Forecast button
+        fetch_btn = QPushButton("Get Forecast")
+        fetch_btn.clicked.connect(self.handle_forecast_fetch)
+        buttons.addWidget(fetch_btn)
+        # Cancel button, enabled while a fetch is running
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_forecast_fetch)
+        buttons.addWidget(self.cancel_btn)
+        # Save Location button, which keeps the last city shown fresh in the background
+        self.save_location_btn = QPushButton("Save Location")
+        self.save_location_btn.setEnabled(False)
+        self.save_location_btn.clicked.connect(self.toggle_saved_location)
+        buttons.addWidget(self.save_location_btn)
+        layout.addLayout(buttons)
+        # Status/report header
+        self.status = QLabel("Weather forecast will appear here.")
+        layout.addWidget(self.status)
+        self.freshness = QLabel()  # When a forecast shown from the background refresh was issued
+        layout.addWidget(self.freshness)
+        # Forecast report, filled in a batch of rows at a time
+        self.forecast_model = ForecastModel(self)
+        self.forecast_model.finished.connect(self.on_report_finished)
+        self.forecast_model.failed.connect(self.on_report_failed)
+        self.forecast_table = ForecastTable(self.forecast_model)
+        layout.addWidget(self.forecast_table)
+        tab.setLayout(layout)
+        return tab
+
+    # Dashboard tab UI: today's rating and clothing for every saved location
+    def create_dashboard_tab(self):
+        tab = QWidget()
+        layout = QVBoxLayout()
+        self.dashboard_job = 0
+        self.dashboard_worker = None
+        # Location table, sortable by any column
+        self.dashboard_table = QTableWidget(0, len(DASHBOARD_COLUMNS))
+        self.dashboard_table.setHorizontalHeaderLabels(DASHBOARD_COLUMNS)
+        self.dashboard_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.dashboard_table.horizontalHeader().setStretchLastSection(True)
+        self.dashboard_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.dashboard_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.dashboard_table.setSortingEnabled(True)
+        layout.addWidget(self.dashboard_table)
+        buttons = QHBoxLayout()  # Menu row
+        # Refresh button
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.refresh_dashboard)
+        buttons.addWidget(refresh_btn)
+        # Remove button, which forgets the selected locations
+        remove_btn = QPushButton("Remove Selected")
+        remove_btn.clicked.connect(self.remove_dashboard_locations)
+        buttons.addWidget(remove_btn)
+        layout.addLayout(buttons)
+        self.dashboard_status = QLabel("Save locations from the Home tab to see them here.")
+        layout.addWidget(self.dashboard_status)
+        tab.setLayout(layout)
+        get_locations_store().subscribe(self.on_locations_changed)
+        return tab
+
+    # Fetches every saved location at once, replacing the rows as results arrive
+    def refresh_dashboard(self):
+        names = [location.name for location in get_locations_store().all()]
+        if self.dashboard_worker:
+            self.dashboard_worker.cancel()
+        self.dashboard_job += 1
+        self.dashboard_table.setRowCount(0)
+        if not names:
+            self.dashboard_worker = None
+            self.dashboard_status.setText("Save locations from the Home tab to see them here.")
+            return
+        self.dashboard_status.setText(f"Fetching {len(names)} locations...")
+        self.dashboard_started = time.perf_counter()
+        worker = DashboardWorker(self.dashboard_job, names)
+        worker.signals.result.connect(self.on_dashboard_row)
+        worker.signals.finished.connect(self.on_dashboard_finished)
+        worker.signals.failed.connect(self.on_dashboard_failed)
+        self.dashboard_worker = worker
+        QThreadPool.globalInstance().start(worker)
+
+    # Adds one location's row to the table
+    def on_dashboard_row(self, job_id, row):
+        if job_id != self.dashboard_job:
+            return
+        table = self.dashboard_table
+        table.setSortingEnabled(False)  # Otherwise the row moves while its cells are being filled
+        position = table.rowCount()
+        table.insertRow(position)
+        values = [row.location, row.period, row.temperature, row.precipitation, row.wind, row.rating, ", ".join(row.clothing), row.grid]
+        for column, value in enumerate(values):
+            item = QTableWidgetItem()
+            item.setData(Qt.DisplayRole, "" if value is None else value)  # Numbers stay numbers, so they sort numerically
+            if row.error:
+                item.setToolTip(row.error)
+            table.setItem(position, column, item)
+        if row.error:
+            table.item(position, DASHBOARD_COLUMNS.index("Clothing")).setText(f"Error: {row.error}")
+        table.setSortingEnabled(True)
+
+    def on_dashboard_finished(self, job_id, count):
+        if job_id != self.dashboard_job:
+            return
+        self.dashboard_worker = None
+        self.dashboard_status.setText(f"Fetched {count} locations in {time.perf_counter() - self.dashboard_started:.1f} s.")
+
+    def on_dashboard_failed(self, job_id, message):
+        if job_id != self.dashboard_job:
+            return
+        self.dashboard_worker = None
+        self.dashboard_status.setText(message)
+
+    # Forgets the locations in the selected rows
+    def remove_dashboard_locations(self):
+        rows = {index.row() for index in self.dashboard_table.selectionModel().selectedRows()}
+        names = [self.dashboard_table.item(row, 0).text() for row in rows]
+        for name in names:
+            get_locations_store().remove(name)
+
+    # Refetches the dashboard when locations are saved or forgotten, once it has been opened
+    def on_locations_changed(self):
+        if self.dashboard_loaded:
+            self.refresh_dashboard()
+
+    # Settings tab UI
+    def create_settings_tab(self):
+        tab = QWidget()
+        layout = QVBoxLayout()
+        # Clothing preferences display
+        layout.addWidget(QLabel("<b>Saved Clothing Preferences:</b>"))
+        self.clth_display = QLabel(self.display_clothing())
+        layout.addWidget(self.clth_display)
+        # Clothing editor button
+        self.clth_btn = QPushButton("Change Clothing Preferences")
+        self.clth_btn.setFixedWidth(300)
+        self.clth_btn.clicked.connect(self.edit_clothing)
+        layout.addWidget(self.clth_btn, alignment=Qt.AlignRight)
+        # Rating preferences display
+        layout.addWidget(QLabel("<b>Saved Rating Preferences:</b>"))
+        self.ratg_display = QLabel(self.display_ratings())
+        layout.addWidget(self.ratg_display)
+        # Rating editor button
+        self.ratg_btn = QPushButton("Change Rating Preferences")
+        self.ratg_btn.setFixedWidth(300)
+        self.ratg_btn.clicked.connect(self.edit_ratings)
+        layout.addWidget(self.ratg_btn, alignment=Qt.AlignRight)
+        # Diagnostics panel, showing how long each step of a forecast takes
+        row3 = QHBoxLayout()
+        self.diagnostics_toggle = QCheckBox("Show Diagnostics")
+        self.diagnostics_toggle.stateChanged.connect(self.toggle_diagnostics)
+        row3.addWidget(self.diagnostics_toggle)
+        self.export_metrics_btn = QPushButton("Export Metrics")
+        self.export_metrics_btn.setFixedWidth(300)
+        self.export_metrics_btn.clicked.connect(self.export_metrics)
+        self.export_metrics_btn.setVisible(False)
+        row3.addWidget(self.export_metrics_btn)
+        layout.addLayout(row3)
+        self.diagnostics_display = QLabel()
+        self.diagnostics_display.setVisible(False)
+        layout.addWidget(self.diagnostics_display)
+        self.diagnostics_timer = QTimer(self)
+        self.diagnostics_timer.timeout.connect(self.refresh_diagnostics)
+        self.diagnostics_toggle.setChecked(metrics.ENABLED)
+        tab.setLayout(layout)
+        return tab
+
+    # Starts or stops collecting stage timings and shows or hides the diagnostics panel
+    def toggle_diagnostics(self, state):
+        shown = state == Qt.Checked
+        metrics.enable(shown)
+        self.diagnostics_display.setVisible(shown)
+        self.export_metrics_btn.setVisible(shown)
+        if shown:
+            self.refresh_diagnostics()
+            self.diagnostics_timer.start(1000)
+        else:
+            self.diagnostics_timer.stop()
+
+    # Shows per-stage latency percentiles, cache results and errors
+    def refresh_diagnostics(self):
+        stats = metrics.snapshot()
+        if not stats:
+            self.diagnostics_display.setText("No forecasts fetched since diagnostics were turned on.")
+            return
+        text = "{0:<15}\t{1:<8}\t{2:<10}\t{3:<10}\t{4:<10}\t{5:<8}\t{6:<8}\t{7}\n".format("Stage", "Count", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Errors", "Retries", "Cache")
+        for stage, s in sorted(stats.items()):
+            cache = ", ".join(f"{result} {count}" for result, count in sorted(s["cache"].items()))
+            text += "{0:<15}\t{1:<8}\t{2:<10}\t{3:<10}\t{4:<10}\t{5:<8}\t{6:<8}\t{7}\n".format(stage, s["count"], s["p50_ms"], s["p95_ms"], s["p99_ms"], s["errors"], s["retries"], cache)
+        self.diagnostics_display.setText(text)
+
+    # Saves the statistics as metrics.prom (Prometheus text) and metrics.json
+    def export_metrics(self):
+        try:
+            metrics.write_prometheus(data_path("metrics.prom"))
+            with open(data_path("metrics.json"), "w") as file:
+                json.dump(metrics.snapshot(), file, indent=1)
+            success_message(f"Metrics saved to {data_path('metrics.prom')} and metrics.json.")
+        except Exception as e:
+            error_message(f"Error saving metrics: {e}")
+
+    # Opens the clothing preferences editor
+    def edit_clothing(self):
+        from sweater_weather.editor import RulesEditor  # Loaded when first needed to keep startup fast
+        RulesEditor("clothing", parent=self).exec_()
+
+    # Opens the rating preferences editor
+    def edit_ratings(self):
+        from sweater_weather.editor import RulesEditor
+        RulesEditor("ratings", parent=self).exec_()
+
+    # Updates the report on screen and the Settings tab when preferences are saved or changed on disk
+    def on_preferences_changed(self, kind):
+        self.update_report()
+        if not self.settings_built:
+            return
+        if kind == "clothing":
+            self.clth_display.setText(self.display_clothing())
+        else:
+            self.ratg_display.setText(self.display_ratings())
+
+    # Switches the theme and the report to a new season once it starts
+    def check_season(self):
+        season = self.get_season()
+        if season == self.current_season:
+            return
+        self.current_season = season
+        self.season_label.setText(f"Theme: {season.title()}")
+        self.apply_seasonal_theme()
+        self.update_report()
+
+    # Gets and prints saved preferences from clothing.json
+    def display_clothing(self):
+        try:
+            prefs = get_preferences_store().rules("clothing")
+            text = ""
+            for p in prefs[:DISPLAY_LIMIT]:
+                if p.season == "all seasons":
+                    season = ""
+                else:
+                    season = p.season + " "
+                text += "{}: {}{}\n".format(p.clothing, season, describe(rule_condition(p)))  # Row formatting
+            if len(prefs) > DISPLAY_LIMIT:
+                text += f"...and {len(prefs) - DISPLAY_LIMIT} more\n"
+            return text
+        except FileNotFoundError:
+            return "No saved clothing preferences."
+        except Exception as e:
+            return f"Unable to load clothing preferences.\nError details: {e}"
+
+    # Gets and prints saved preferences from ratings.json
+    def display_ratings(self):
+        try:
+            prefs = get_preferences_store().rules("ratings")
+            text = ""
+            for p in prefs[:DISPLAY_LIMIT]:
+                text += "{}: {}\n".format(p.rating, describe(rule_condition(p)))  # Row formatting
+            if len(prefs) > DISPLAY_LIMIT:
+                text += f"...and {len(prefs) - DISPLAY_LIMIT} more\n"
+            return text
+        except FileNotFoundError:
+            return "No saved rating preferences."
+        except Exception as e:
+            return f"Unable to load rating preferences\nError details: {e}"
+
+    # Refreshes autocomplete suggestions for the typed city name, saved locations first
+    # then the known places nearest the last forecast shown, which are all that is listed while the box is empty
+    def update_location_matches(self, text):
+        key = normalize_query(text)
+        saved = [location.name for location in get_locations_store().all() if key and normalize_query(location.name).startswith(key)]
+        nearby = [label for label, _ in get_grid_index().nearest(*self.last_coordinates)] if self.last_coordinates else []
+        nearby = [label for label in nearby if normalize_query(label).startswith(key) and label not in saved]
+        matches = saved + nearby
+        self.location_matches.setStringList(matches + [label for label in get_geocode_index().complete(text) if key and label not in matches])
+
+    # Saves the last city shown, or forgets it if it is already saved
+    def toggle_saved_location(self):
+        if not self.last_location:
+            return
+        label, lat, lon = self.last_location
+        store = get_locations_store()
+        try:
+            if store.get(label):
+                store.remove(label)
+            else:
+                store.add(label, lat, lon)
+        except Exception as e:
+            error_message(f"Error saving location: {e}")
+
+    # Labels the Save Location button for the city in the location box
+    def update_save_button(self, *args):
+        saved = get_locations_store().get(self.location_input.text().strip() or "")
+        self.save_location_btn.setText("Forget Location" if saved else "Save Location")
+        self.save_location_btn.setEnabled(bool(saved) or bool(self.last_location and normalize_query(self.last_location[0]) == normalize_query(self.location_input.text())))
+
+    # Disables location text input when Get Current Locaiton is checked
+    def toggle_location_input(self, state):
+        self.location_input.setDisabled(state == Qt.Checked)
+
+    # Starts a background fetch, replacing any fetch that is still running
+    def handle_forecast_fetch(self):
+        city_name = self.location_input.text().strip()
+        use_current_location = self.use_current_location.isChecked()
+        # Prevent empty input
+        if not use_current_location and not city_name:
+            self.status.setText("Please enter a city or enable 'Use My Current Location'.")
+            return
+        self.cancel_forecast_fetch()
+        self.fetch_job += 1
+        # Known locations are shown at once from the background refresh
+        name = None if use_current_location else city_name
+        grid = self.use_hourly.isChecked() and self.use_grid.isChecked()
+        snapshot = None if grid else self.scheduler.snapshot(name, self.use_hourly.isChecked())
+        if snapshot:
+            self.shown = (name, self.use_hourly.isChecked())
+            self.show_snapshot(snapshot)
+            if is_stale(snapshot):
+                self.scheduler.refresh_now(name)
+            return
+        self.shown = None
+        self.freshness.setText("")
+        if self.forecast_model.streaming():
+            self.forecast_model.clear()  # A half-filled report of the previous location would be misleading
+        worker = ForecastWorker(self.fetch_job, city_name, use_current_location, self.use_hourly.isChecked(), grid, self.current_season)
+        worker.signals.progress.connect(self.on_fetch_progress)
+        worker.signals.finished.connect(self.on_fetch_finished)
+        worker.signals.failed.connect(self.on_fetch_failed)
+        self.active_worker = worker
+        self.cancel_btn.setEnabled(True)
+        QThreadPool.globalInstance().start(worker)
+
+    # Cancels the running fetch, if any
+    def cancel_forecast_fetch(self):
+        if self.active_worker:
+            self.active_worker.cancel()
+            self.active_worker = None
+            self.cancel_btn.setEnabled(False)
+            self.status.setText("Forecast request cancelled.")
+
+    # Shows the stage a fetch has reached
+    def on_fetch_progress(self, job_id, message):
+        if job_id == self.fetch_job and self.active_worker:
+            self.status.setText(message)
+
+    # Generates and displays the report once forecast data arrives
+    def on_fetch_finished(self, job_id, result):
+        if job_id != self.fetch_job or not self.active_worker:
+            return
+        self.active_worker = None
+        self.cancel_btn.setEnabled(False)
+        periods = result["periods"]
+        self.last_coordinates = (result["lat"], result["lon"])
+        if not self.use_current_location.isChecked():
+            self.last_location = (result["label"], result["lat"], result["lon"])
+            self.update_save_button()
+        if result.get("rows") is not None:
+            self.show_rows(result["rows"], result["message"], result["hourly"])
+        elif periods:
+            self.show_report(periods, result["hourly"])
+        else:
+            self.report_source = None
+            self.forecast_model.clear()
+            self.status.setText("No forecast data available. Try selecting a differernt locaiton.")
+
+    # Shows why a fetch failed
+    def on_fetch_failed(self, job_id, message):
+        if job_id != self.fetch_job or not self.active_worker:
+            return
+        self.active_worker = None
+        self.cancel_btn.setEnabled(False)
+        self.status.setText(message)
+
+    # Shows a forecast kept by the scheduler, noting when it is out of date
+    def show_snapshot(self, snapshot):
+        name, hourly = self.shown
+        if name:
+            location = get_locations_store().get(name)
+            self.last_location = (location.name, location.lat, location.lon) if location else self.last_location
+            self.last_coordinates = (location.lat, location.lon) if location else self.last_coordinates
+            self.update_save_button()
+        if snapshot.periods:
+            self.show_report(snapshot.periods, hourly)
+        else:
+            self.report_source = None
+            self.forecast_model.clear()
+            self.status.setText("No forecast data available. Try selecting a differernt locaiton.")
+        as_of = time.strftime("%I:%M %p", time.localtime(snapshot.as_of)).lstrip("0")
+        if is_stale(snapshot):
+            self.freshness.setText(f"{snapshot.label}: stale as of {as_of}, refresh pending")
+        else:
+            self.freshness.setText(f"{snapshot.label}: as of {as_of}")
+
+    # Redraws the forecast on screen when the scheduler has a newer copy of it
+    def on_snapshot_refreshed(self, key):
+        if self.shown is None or self.active_worker or self.scheduler.key(self.shown[0]) != key:
+            return
+        snapshot = self.scheduler.snapshot(*self.shown)
+        if snapshot:
+            self.show_snapshot(snapshot)
+
+    # Determines which user preferences are met by forecast data and streams them into the report table
+    def show_report(self, periods, hourly=False):
+        self.report_hourly = hourly
+        self.report_source = None
+        try:
+            if hourly:
+                from sweater_weather import hourly as hourly_report  # Only hourly mode needs NumPy
+                self.report_source = periods if isinstance(periods, hourly_report.HourlyForecast) else hourly_report.HourlyForecast(periods)
+            else:
+                self.report_source = core.PeriodReport(periods)
+        except Exception as e:
+            self.on_report_failed(str(e))
+            return
+        self.render_report()
+
+    # Matches the preferences against the forecast on screen; with in_place, the table's rows are swapped at once
+    # rather than cleared and streamed in again, which suits a report that only changed in a few rows
+    def render_report(self, in_place=False):
+        try:
+            engine = get_preferences_store().engine()
+            if not engine.clothing and not engine.ratings:
+                self.forecast_model.clear()
+                self.status.setText(core.NO_PREFERENCES)
+                return
+            if self.report_hourly:
+                from sweater_weather import hourly as hourly_report
+                rows = hourly_report.hourly_rows(self.report_source, engine, self.current_season)
+            else:
+                rows = self.report_source.rows(engine, self.current_season)
+            if in_place:
+                self.forecast_model.replace(rows)
+            else:
+                self.status.setText("Evaluating preferences...")
+                self.forecast_model.stream(rows)
+        except Exception as e:
+            self.on_report_failed(str(e))
+
+    # Redoes the report on screen for changed preferences or a new season, without fetching the forecast again
+    def update_report(self):
+        if self.report_source is not None and not self.active_worker:
+            self.render_report(in_place=True)
+
+    # Shows report rows made by a Sweater Weather service, or its message when there are none
+    def show_rows(self, rows, message, hourly=False):
+        self.report_hourly = hourly
+        self.report_source = None  # The service has the forecast, so changed preferences take a new fetch
+        if not rows:
+            self.forecast_model.clear()
+            self.status.setText(message or core.NO_SUGGESTIONS)
+            return
+        self.forecast_model.stream(rows)
+
+    # Sums up the report once every row is shown
+    def on_report_finished(self, count):
+        if count:
+            self.status.setText(f"{count} {'hours' if self.report_hourly else 'periods'} with suggestions. Highlighted rows are where suggestions change.")
+        elif self.report_hourly:
+            from sweater_weather.hourly import NO_SUGGESTIONS
+            self.status.setText(NO_SUGGESTIONS)
+        else:
+            self.status.setText(core.NO_SUGGESTIONS)
+
+    def on_report_failed(self, message):
+        self.status.setText(f"Unable to generate report.\nError details: {message}")
+
+
+# Opens the main window and runs the Qt event loop, reusing the splash screen if one is already shown
+def main(splash=None):
+    metrics.configure_from_environment()
+    splash = splash or show_splash()
+    app = QApplication.instance()
+    main_window = SweaterWeatherApp()
+    main_window.show()
+    splash.finish(main_window)
+    return app.exec_()
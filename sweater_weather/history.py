@@ -0,0 +1,298 @@
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+import numpy as np
+from sweater_weather.config import data_path, replace_file
+from sweater_weather.precipitation import get_classifier
+from sweater_weather.rules import PRECIPITATION
+
+
+# Every forecast period ever fetched, kept as fixed-width columns in memory-mapped files (history/<column>.col)
+# Rows are only ever appended, a batch of forecasts at a time, so a column file is a plain array that NumPy maps without parsing
+# Column -> dtype
+COLUMNS = {
+    "time": "<i8",  # Start of the period, Unix seconds
+    "hours": "<i2",  # Length of the period: 1 for hourly forecasts, usually 12 otherwise
+    "hour": "<i1",  # Local hour the period starts, for time of day conditions
+    "grid": "<i4",  # Position of the NWS grid cell (e.g. "FWD/89,113") in the store's grid list
+    "issued": "<i8",  # When NWS issued the forecast, Unix seconds
+    "temperature": "<f4",  # Degrees F
+    "wind": "<f4",  # Highest wind speed in mph
+    "precipitation": "<i1",  # Code, see rules.PRECIPITATION
+    "chance": "<f4",  # Chance of precipitation in percent, NaN if not given
+}
+BLOCK = 16384  # Rows per block of the time index
+FORECAST_URL = re.compile(r"/gridpoints/([A-Z]{3}/\d+,\d+)/forecast(/hourly)?/?$")
+# Season of each month, indexed by month number
+MONTH_SEASONS = ["winter", "winter", "winter", "spring", "spring", "spring", "summer", "summer", "summer", "autumn", "autumn", "autumn", "winter"]
+
+
+# Reads an ISO 8601 time as Unix seconds
+def timestamp(text):
+    return int(datetime.fromisoformat(text).timestamp())
+
+
+# Converts the periods of one NWS forecast to column arrays
+def forecast_columns(periods, grid, issued):
+    classifier = get_classifier()
+    n = len(periods)
+    starts = [datetime.fromisoformat(p["startTime"]) for p in periods]
+    time = np.fromiter((int(t.timestamp()) for t in starts), dtype=np.int64, count=n)
+    end = np.fromiter((timestamp(p["endTime"]) for p in periods), dtype=np.int64, count=n)
+    return {
+        "time": time,
+        "hours": (end - time) // 3600,
+        "hour": np.fromiter((t.hour for t in starts), dtype=np.int8, count=n),
+        "grid": np.full(n, grid, dtype=np.int32),
+        "issued": np.full(n, issued, dtype=np.int64),
+        "temperature": np.fromiter((p["temperature"] for p in periods), dtype=np.float32, count=n),
+        "wind": np.fromiter((max(map(int, re.findall(r"\d+", p["windSpeed"] or "")), default=0) for p in periods), dtype=np.float32, count=n),
+        # Hourly periods have no detailed forecast, so the short forecast is classified instead
+        "precipitation": np.fromiter((PRECIPITATION.index(classifier.classify(p.get("detailedForecast") or p.get("shortForecast") or "")[0]) for p in periods), dtype=np.int8, count=n),
+        "chance": np.fromiter((np.nan if (p.get("probabilityOfPrecipitation") or {}).get("value") is None else p["probabilityOfPrecipitation"]["value"] for p in periods), dtype=np.float32, count=n),
+    }
+
+
+# Append-only forecast history; columns are memory-mapped for queries and remapped when rows are added
+# A small index file (index.json) holds the grid cell names and the newest forecast stored for each, so unchanged forecasts are not stored twice
+# The window, batch reports and the report service may all record to one folder, so writes hold a lock on history/.lock
+# and reread the index and column lengths first, in case another process has added rows since
+class HistoryStore:
+    def __init__(self, directory=None):
+        self.directory = directory or data_path("history")
+        self.lock = threading.RLock()
+        self.grids = []  # Grid cell names, by id
+        self.latest = {}  # "<grid> <hourly|periods>" -> issue time of the newest forecast stored
+        self.count = 0
+        self.writers = 0  # Nested writing() blocks of this store; the file lock is taken by the outermost
+        self.maps = None  # Column -> memory-mapped array of the first `mapped` rows
+        self.mapped = 0
+        self.block_min = np.empty(0, dtype=np.int64)  # Earliest and latest period start in each block of rows
+        self.block_max = np.empty(0, dtype=np.int64)
+        if os.path.isdir(self.directory):
+            with self.writing():
+                pass
+
+    # Reads the index and column lengths as they are on disk (the file lock must be held)
+    def load(self):
+        try:
+            with open(os.path.join(self.directory, "index.json"), "r") as file:
+                index = json.load(file)
+            self.grids, self.latest = index["grids"], index["latest"]
+        except (OSError, ValueError, KeyError):
+            pass
+        # A write cut short leaves some columns longer than others; the rows every column has are kept
+        sizes = [os.path.getsize(self.path(name)) // np.dtype(dtype).itemsize if os.path.exists(self.path(name)) else 0 for name, dtype in COLUMNS.items()]
+        self.count = min(sizes)
+        for name, dtype in COLUMNS.items():
+            if os.path.exists(self.path(name)) and os.path.getsize(self.path(name)) != self.count * np.dtype(dtype).itemsize:
+                os.truncate(self.path(name), self.count * np.dtype(dtype).itemsize)
+        if self.count < self.mapped:
+            self.maps, self.mapped = None, 0  # Rows mapped before were cut off; map from scratch
+            self.block_min, self.block_max = self.block_min[:0], self.block_max[:0]
+
+    # Holds the thread lock and the folder's file lock, with the index and column lengths brought up to date
+    @contextmanager
+    def writing(self):
+        with self.lock:
+            if self.writers:
+                self.writers += 1
+                try:
+                    yield
+                finally:
+                    self.writers -= 1
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, ".lock"), "a+b") as file:
+                if fcntl:
+                    fcntl.flock(file, fcntl.LOCK_EX)
+                else:
+                    file.seek(0)
+                    while True:
+                        try:
+                            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)  # Gives up after 10 seconds
+                            break
+                        except OSError:
+                            pass
+                self.writers += 1
+                try:
+                    self.load()
+                    yield
+                finally:
+                    self.writers -= 1
+                    if fcntl:
+                        fcntl.flock(file, fcntl.LOCK_UN)
+                    else:
+                        file.seek(0)
+                        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def __len__(self):
+        return self.count
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.col")
+
+    # Gets the id of a grid cell name, adding it if it is new
+    def grid_id(self, name):
+        if name not in self.grids:
+            self.grids.append(name)
+        return self.grids.index(name)
+
+    # Appends rows given as column arrays, all of the same length
+    def append(self, columns):
+        with self.writing():
+            for name, dtype in COLUMNS.items():
+                with open(self.path(name), "ab") as file:
+                    file.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+            self.count += len(columns["time"])
+
+    # Appends fetched forecasts, given as (forecast URL, NWS response JSON) pairs, in one batch
+    # Forecasts already stored (the same issue time for the same grid cell) and non-forecast URLs are skipped
+    def append_forecasts(self, forecasts):
+        with self.writing():
+            batches = []
+            for url, data in forecasts:
+                match = FORECAST_URL.search(url)
+                properties = data.get("properties") or {}
+                periods = properties.get("periods")
+                issued = properties.get("updateTime") or properties.get("generatedAt")
+                if not match or not periods or not issued:
+                    continue
+                key = f"{match.group(1)} {'hourly' if match.group(2) else 'periods'}"
+                issued = timestamp(issued)
+                if issued <= self.latest.get(key, 0):
+                    continue
+                batches.append(forecast_columns(periods, self.grid_id(match.group(1)), issued))
+                self.latest[key] = issued
+            if not batches:
+                return 0
+            columns = {name: np.concatenate([batch[name] for batch in batches]) for name in COLUMNS}
+            self.save_index()  # First, so no stored row has a grid id the index does not know
+            self.append(columns)
+            return len(columns["time"])
+
+    # Replaces index.json in one step, so a crash cannot truncate it
+    def save_index(self):
+        replace_file(os.path.join(self.directory, "index.json"), json.dumps({"grids": self.grids, "latest": self.latest}))
+
+    # Gets every column as a read-only memory-mapped array; only the pages a query touches are read from disk
+    def columns(self):
+        with self.lock:
+            if self.maps is None or self.mapped != self.count:
+                count = self.count
+                self.maps = {name: np.memmap(self.path(name), dtype=dtype, mode="r", shape=(count,)) if count else np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+                # Blocks that were complete at the last mapping keep their bounds; the rest are worked out again
+                done = self.mapped // BLOCK
+                starts = np.arange(done * BLOCK, count, BLOCK)
+                time = self.maps["time"]
+                self.block_min = np.concatenate((self.block_min[:done], np.minimum.reduceat(time, starts) if len(starts) else starts))
+                self.block_max = np.concatenate((self.block_max[:done], np.maximum.reduceat(time, starts) if len(starts) else starts))
+                self.mapped = count
+            return self.maps
+
+    # Gets the rows whose period starts in [start, end) (Unix seconds; None for no limit) as a dict of column arrays
+    # grid limits the rows to one grid cell name, and hourly to hourly (True) or 12-hour (False) forecasts
+    # Blocks of rows whose times are all outside the range are skipped without being read
+    def select(self, start=None, end=None, grid=None, hourly=None):
+        columns = self.columns()
+        with self.lock:
+            block_min, block_max, count = self.block_min, self.block_max, self.mapped
+        if grid is not None and grid not in self.grids:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        start = np.iinfo(np.int64).min if start is None else start
+        end = np.iinfo(np.int64).max if end is None else end
+        grid = None if grid is None else self.grids.index(grid)
+        rows = []
+        for block in np.flatnonzero((block_max >= start) & (block_min < end)):
+            low, high = block * BLOCK, min(count, (block + 1) * BLOCK)
+            time = columns["time"][low:high]
+            keep = (time >= start) & (time < end)
+            if grid is not None:
+                keep &= columns["grid"][low:high] == grid
+            if hourly is not None:
+                keep &= (columns["hours"][low:high] == 1) == hourly
+            rows.append(np.flatnonzero(keep) + low)
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        return {name: np.asarray(column[rows]) for name, column in columns.items()}
+
+
+# Sorts rows so that forecasts of the same period of the same grid cell are together, oldest issue first
+# Returns (order, where each group starts within the order)
+def group_periods(frame):
+    order = np.lexsort((frame["issued"], frame["hours"], frame["time"], frame["grid"]))
+    keys = np.stack([frame["grid"][order], frame["time"][order], frame["hours"][order]])
+    starts = np.flatnonzero(np.concatenate(([True], (keys[:, 1:] != keys[:, :-1]).any(axis=0)))) if len(order) else np.empty(0, dtype=np.int64)
+    return order, starts
+
+
+# Counts the forecasts (grid cell and issue time) the rows came from
+def forecast_count(frame):
+    return int(np.unique(np.stack((frame["grid"].astype(np.int64), frame["issued"])), axis=1).shape[1])
+
+
+# Keeps only the last forecast made for each period, the closest there is to what actually happened
+def latest(frame):
+    order, starts = group_periods(frame)
+    last = order[np.append(starts[1:], len(order))[:len(starts)] - 1]
+    return {name: column[last] for name, column in frame.items()}
+
+
+# Compares the first and last forecast of every period forecast more than once
+# Returns column arrays: time, grid, lead (hours between the first forecast and the period) and change (last - first)
+def drift(frame, column="temperature"):
+    order, starts = group_periods(frame)
+    ends = np.append(starts[1:], len(order))[:len(starts)] - 1
+    repeated = ends > starts
+    first, last = order[starts[repeated]], order[ends[repeated]]
+    return {
+        "time": frame["time"][first],
+        "grid": frame["grid"][first],
+        "lead": (frame["time"][first] - frame["issued"][first]) / 3600,
+        "change": frame[column][last].astype(np.float64) - frame[column][first],
+    }
+
+
+# Counts how many periods each rating and clothing item was suggested for, using the last forecast of each period
+# Each period is judged in its own season; engine is a rules.RuleEngine
+def suggestion_counts(frame, engine):
+    from sweater_weather.hourly import HourlyForecast
+    frame = latest(frame)
+    months = frame["time"].astype("datetime64[s]").astype("datetime64[M]").astype(np.int64) % 12 + 1
+    seasons = np.array(MONTH_SEASONS, dtype=object)[months]
+    counts = dict.fromkeys([rule.rating for rule in engine.ratings] + [rule.clothing for rule in engine.clothing], 0)
+    for season in dict.fromkeys(seasons.tolist()):
+        rows = seasons == season
+        forecast = HourlyForecast.from_arrays(frame["time"][rows], frame["time"][rows] + 3600 * frame["hours"][rows], {
+            "temperature": frame["temperature"][rows],
+            "precipitation": frame["precipitation"][rows],
+            "wind speed": frame["wind"][rows],
+            "precipitation chance": frame["chance"][rows],
+            "hour": frame["hour"][rows],
+        })
+        positions = forecast.rating_positions(engine.ratings, season)
+        for i, rule in enumerate(engine.ratings):
+            counts[rule.rating] += int((positions == i).sum())
+        for name, mask in forecast.clothing_masks(engine.clothing, season):
+            counts[name] += int(mask.sum())
+    return counts
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+# Gets the shared history store
+def get_history_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
@@ -0,0 +1,213 @@
+import re
+from collections import namedtuple
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import numpy as np
+from sweater_weather import metrics
+from sweater_weather.core import NO_PREFERENCES, ReportRow, get_season
+from sweater_weather.precipitation import get_classifier
+from sweater_weather.preferences import get_preferences_store
+from sweater_weather.rules import PRECIPITATION, plan, uses_season
+
+
+# Consecutive hours that share a suggestion, e.g. "sweater" from Mon 6am to Mon 11am
+HourlyRange = namedtuple("HourlyRange", ["suggestion", "start", "end", "hours"])
+HEADER = "{0:<25}\t{1:<30}\t{2:<15}\t".format("Suggestion", "When", "Hours")
+NO_SUGGESTIONS = "No suggestions for the next few days."
+DIGITS = re.compile(r"\d+")
+
+
+# Hourly forecast periods as parallel NumPy arrays, one entry per hour
+class HourlyForecast:
+    def __init__(self, periods):
+        classifier = get_classifier()
+        n = len(periods)
+        self.starts = [datetime.fromisoformat(p["startTime"]) for p in periods]
+        self.ends = [datetime.fromisoformat(p["endTime"]) for p in periods]
+        self.start_time = np.array([int(t.timestamp()) for t in self.starts], dtype=np.int64)
+        self.end_time = np.array([int(t.timestamp()) for t in self.ends], dtype=np.int64)
+        self.values = {
+            "temperature": np.fromiter((int(p["temperature"]) for p in periods), dtype=np.int32, count=n),
+            # Hourly periods have no detailed forecast, so the short forecast is classified instead
+            "precipitation": np.fromiter((PRECIPITATION.index(classifier.classify(p["detailedForecast"] or p["shortForecast"])[0]) for p in periods), dtype=np.int8, count=n),
+            "wind speed": np.fromiter((max(int(i) for i in DIGITS.findall(p["windSpeed"]) or [0]) for p in periods), dtype=np.int32, count=n),
+            "precipitation chance": np.fromiter((chance(p) for p in periods), dtype=np.float32, count=n),
+            "hour": np.fromiter((t.hour for t in self.starts), dtype=np.int8, count=n),
+        }
+        self.masks = {}  # (rule, season or None if the rule ignores it) -> mask, so changed preferences only mask changed rules
+
+    # Builds the hourly arrays straight from decoded gridpoint data (see gridpoints.GridSeries), with no text parsing
+    # Hours before `since` (a Unix timestamp) and hours without a temperature are left out
+    @classmethod
+    def from_grid(cls, series, since=None):
+        times = series.times()
+        keep = ~np.isnan(series.values["temperature"])
+        if since is not None:
+            keep &= times + 3600 > since
+        forecast = cls.__new__(cls)
+        zone = ZoneInfo(series.timezone) if series.timezone else None
+        forecast.start_time = times[keep]
+        forecast.end_time = forecast.start_time + 3600
+        forecast.starts = [datetime.fromtimestamp(t, zone) for t in forecast.start_time.tolist()]
+        forecast.ends = [datetime.fromtimestamp(t, zone) for t in forecast.end_time.tolist()]
+        forecast.values = {factor: values[keep] for factor, values in series.values.items()}
+        forecast.values["hour"] = np.fromiter((t.hour for t in forecast.starts), dtype=np.int8, count=len(forecast.starts))
+        forecast.masks = {}
+        return forecast
+
+    # Builds the hourly arrays from periods already decoded (e.g. stored history), given as start and end times
+    # in Unix seconds and a dict of value arrays; starts and ends are left out, so it can be masked but not reported
+    @classmethod
+    def from_arrays(cls, start_time, end_time, values):
+        forecast = cls.__new__(cls)
+        forecast.start_time, forecast.end_time = start_time, end_time
+        forecast.starts = forecast.ends = None
+        forecast.values = values
+        forecast.masks = {}
+        return forecast
+
+    def __len__(self):
+        return len(self.start_time)
+
+    # Gets a boolean mask of the hours where a rule's factor is within its range and its extra conditions are met
+    # Factors the forecast does not have match no hours; masks are kept, read-only, for as long as the forecast
+    def mask(self, rule, season=None):
+        key = (rule, season if uses_season(rule) else None)
+        mask = self.masks.get(key)
+        if mask is None:
+            mask = self.masks[key] = self.rule_mask(rule, season)
+            mask.flags.writeable = False
+        return mask
+
+    def rule_mask(self, rule, season=None):
+        if not rule.factor:
+            mask = np.ones(len(self), dtype=bool)
+        elif rule.factor in self.values:
+            values = self.values[rule.factor]
+            mask = (values >= rule.min) & (values <= rule.max)
+        else:
+            return np.zeros(len(self), dtype=bool)
+        if rule.when and mask.any():
+            mask &= self.condition_mask(plan(rule.when)[0], season)
+        return mask
+
+    # Gets a boolean mask of the hours meeting a condition (see rules.parse_condition), in rules.plan order
+    # Stops once every hour has failed an "all" or passed an "any"
+    def condition_mask(self, condition, season=None):
+        kind = condition[0]
+        if kind == "range":
+            values = self.values.get(condition[1])
+            if values is None:
+                return np.zeros(len(self), dtype=bool)
+            return (values >= condition[2]) & (values <= condition[3])
+        if kind == "season":
+            return np.full(len(self), season in condition[1])
+        if kind == "time":
+            allowed = np.zeros(24, dtype=bool)
+            allowed[list(condition[1])] = True
+            return allowed[self.values["hour"]]
+        mask = None
+        for part in condition[1]:
+            part_mask = self.condition_mask(part, season)
+            mask = part_mask if mask is None else mask & part_mask if kind == "all" else mask | part_mask
+            if not mask.any() if kind == "all" else mask.all():
+                break
+        return mask
+
+    # Gets, for each hour, the position of the first matching rating rule, or -1
+    def rating_positions(self, ratings, season=None):
+        positions = np.full(len(self), -1, dtype=np.int32)
+        for i, rule in enumerate(ratings):
+            positions[self.mask(rule, season) & (positions < 0)] = i
+        return positions
+
+    # Gets (name, mask) for each clothing item in the season, in the order it was first saved
+    # Several rules for the same item are combined into one mask
+    def clothing_masks(self, clothing, season):
+        masks = {}
+        for rule in clothing:
+            if rule.season in ("all seasons", season):
+                mask = self.mask(rule, season)
+                masks[rule.clothing] = masks[rule.clothing] | mask if rule.clothing in masks else mask
+        return list(masks.items())
+
+    # Gets the names of the clothing items in the season, in the order they were first saved, and an hour x item array of
+    # the position of the item's first rule that applies in that hour (len(clothing) where none does)
+    # Ordering an hour's items by it lists them as RuleEngine.suggestions does for the same values
+    def clothing_positions(self, clothing, season):
+        columns = {}
+        positions = np.full((len(self), len({rule.clothing for rule in clothing})), len(clothing), dtype=np.int32)
+        for i, rule in enumerate(clothing):
+            if rule.season in ("all seasons", season):
+                column = positions[:, columns.setdefault(rule.clothing, len(columns))]
+                column[self.mask(rule, season) & (column == len(clothing))] = i
+        return list(columns), positions[:, :len(columns)]
+
+    # Splits a mask into runs of consecutive hours, breaking where the hours are not back to back
+    def runs(self, mask):
+        if not mask.any():
+            return []
+        contiguous = np.ones(len(self), dtype=bool)
+        contiguous[1:] = self.start_time[1:] == self.end_time[:-1]
+        padded = np.concatenate(([False], mask, [False]))
+        starts = np.flatnonzero(padded[1:-1] & ~(padded[:-2] & contiguous))
+        ends = np.flatnonzero(padded[1:-1] & ~(padded[2:] & np.append(contiguous[1:], False)))
+        return list(zip(starts, ends))
+
+
+# Gets a period's chance of precipitation in percent, or NaN if it is not given
+def chance(period):
+    value = (period.get("probabilityOfPrecipitation") or {}).get("value")
+    return np.nan if value is None else value
+
+
+# Evaluates every preference over the whole hourly forecast at once
+# Yields an HourlyRange for each run of consecutive hours with the same rating, then for each clothing item
+def hourly_ranges(forecast, engine=None, season=None):
+    engine = engine or get_preferences_store().engine()
+    season = season or get_season()
+    positions = forecast.rating_positions(engine.ratings, season)
+    names = np.array([rule.rating for rule in engine.ratings] + [""], dtype=object)[positions]  # -1 picks ""
+    for rating in dict.fromkeys(rule.rating for rule in engine.ratings):
+        for start, end in forecast.runs(names == rating):
+            yield HourlyRange(rating, forecast.starts[start], forecast.ends[end], int(end - start + 1))
+    for name, mask in forecast.clothing_masks(engine.clothing, season):
+        for start, end in forecast.runs(mask):
+            yield HourlyRange(name, forecast.starts[start], forecast.ends[end], int(end - start + 1))
+
+
+# Evaluates every preference over the whole hourly forecast at once
+# Yields a core.ReportRow, timed like "Mon 6am", for each hour with at least one suggestion
+def hourly_rows(forecast, engine=None, season=None):
+    engine = engine or get_preferences_store().engine()
+    season = season or get_season()
+    positions = forecast.rating_positions(engine.ratings, season)
+    names, firsts = forecast.clothing_positions(engine.clothing, season)
+    matrix = firsts < len(engine.clothing)  # Hour x clothing item
+    values = forecast.values
+    for i in np.flatnonzero((positions >= 0) | matrix.any(axis=1)):
+        rating = engine.ratings[positions[i]].rating if positions[i] >= 0 else None
+        items = np.flatnonzero(matrix[i])
+        items = items[np.argsort(firsts[i, items], kind="stable")]  # By first rule that applies, as in the period report
+        suggestions = ([rating] if rating is not None else []) + [names[j] for j in items if names[j] != rating]
+        yield ReportRow(format_hour(forecast.starts[i]), int(values["temperature"][i]), PRECIPITATION[values["precipitation"][i]], int(values["wind speed"][i]), suggestions)
+
+
+# Formats a time as e.g. "Mon 6am"
+def format_hour(time):
+    return "{} {}{}".format(time.strftime("%a"), time.hour % 12 or 12, "am" if time.hour < 12 else "pm")
+
+
+# Formats the hourly report as tab-padded text; returns (header, report)
+# Takes hourly forecast periods, or an HourlyForecast already built (e.g. from gridpoint data)
+def report(periods, engine=None, season=None):
+    engine = engine or get_preferences_store().engine()
+    if not engine.clothing and not engine.ratings:
+        return NO_PREFERENCES, None
+    with metrics.span("hourly_report"):
+        forecast = periods if isinstance(periods, HourlyForecast) else HourlyForecast(periods)
+        ranges = sorted(hourly_ranges(forecast, engine, season), key=lambda r: r.start)
+    if not ranges:
+        return NO_SUGGESTIONS, ""
+    lines = ["{0:<25}\t{1:<30}\t{2:<15}\t\n".format(r.suggestion, f"{format_hour(r.start)} – {format_hour(r.end)}", r.hours) for r in ranges]
+    return HEADER, "".join(lines)
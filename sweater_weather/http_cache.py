@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+from sweater_weather import metrics
+from sweater_weather.config import data_path
+
+
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024  # Size cap before least recently used entries are evicted
+TOUCH_INTERVAL = 60  # Seconds before a hit records a new access time; eviction order needs no finer detail
+
+
+# Reads an HTTP date header as a Unix timestamp
+def parse_http_date(value):
+    from email.utils import parsedate_to_datetime  # Imported on first use to keep startup fast
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+# Works out when a response stops being fresh from its Cache-Control/Expires headers (lowercase names)
+# Returns None when the response must not be stored; s-maxage is for shared caches, so this private one ignores it
+def expiry_time(headers, now, min_ttl=0):
+    directives = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return now + min_ttl
+    if "max-age" in directives:
+        try:
+            age = int(headers.get("age", 0))
+            return now + max(int(directives["max-age"]) - age, min_ttl)
+        except ValueError:
+            pass
+    expires = parse_http_date(headers.get("expires"))
+    if expires is not None:
+        # Measure against the server's clock so local clock skew does not matter
+        date = parse_http_date(headers.get("date")) or now
+        return now + max(expires - date, min_ttl)
+    return now + min_ttl
+
+
+# Response-like object returned for both network and cached responses
+class CachedResponse:
+    def __init__(self, status_code, headers, content, from_cache, expires=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.from_cache = from_cache
+        self.expires = expires  # When the response stops being fresh, or None if it was not cached
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+# SQLite-backed HTTP response cache with a size cap and LRU eviction
+class HttpCache:
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        import sqlite3  # Imported on first use to keep startup fast
+        self.path = path or data_path("http_cache.sqlite")
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS responses (
+            url TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB,
+            expires REAL, accessed REAL, size INTEGER)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.db.commit()
+
+    # Gets a stored entry as (status, headers, body, expires), or None
+    # The access time is only written when it is older than TOUCH_INTERVAL, so most hits do no write at all
+    def get(self, url):
+        with self.lock:
+            row = self.db.execute("SELECT status, headers, body, expires, accessed FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[4] > TOUCH_INTERVAL:
+                self.db.execute("UPDATE responses SET accessed = ? WHERE url = ?", (now, url))
+                self.db.commit()
+        return row[0], json.loads(row[1]), row[2], row[3]
+
+    # Stores a response, evicting old entries if the cache grows past its cap
+    def put(self, url, status, headers, body, expires):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (url, status, json.dumps(headers), body, expires, time.time(), len(body)))
+            self.evict()
+            self.db.commit()
+
+    # Extends a stored entry after the server confirms it is unchanged (304)
+    def refresh(self, url, headers, expires):
+        with self.lock:
+            row = self.db.execute("SELECT headers FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return
+            merged = json.loads(row[0])
+            merged.update(headers)
+            self.db.execute("UPDATE responses SET headers = ?, expires = ?, accessed = ? WHERE url = ?",
+                            (json.dumps(merged), expires, time.time(), url))
+            self.db.commit()
+
+    def delete(self, url):
+        with self.lock:
+            self.db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM responses")
+            self.db.commit()
+
+    # Deletes least recently used entries until the total size fits the cap (lock must be held)
+    def evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self.db.execute("SELECT url, size FROM responses ORDER BY accessed").fetchall():
+            self.db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Gets the shared cache, opening it on first use
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache()
+        return _cache
+
+
+# GET that serves fresh entries from the cache and revalidates stale ones with ETag/Last-Modified
+# min_ttl keeps a response fresh for at least that many seconds, whatever its headers say
+def cached_get(get, url, cache=None, min_ttl=0, **kwargs):
+    cache = cache or get_cache()
+    now = time.time()
+    entry = cache.get(url)
+    if entry and entry[3] > now:
+        metrics.annotate(cache="hit", bytes=len(entry[2]))
+        return CachedResponse(entry[0], entry[1], entry[2], True, entry[3])
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry:
+        if entry[1].get("etag"):
+            headers["If-None-Match"] = entry[1]["etag"]
+        if entry[1].get("last-modified"):
+            headers["If-Modified-Since"] = entry[1]["last-modified"]
+    response = get(url, headers=headers, **kwargs)
+    response_headers = {name.lower(): value for name, value in response.headers.items()}
+    if response.status_code == 304 and entry:
+        metrics.annotate(cache="revalidated")
+        expires = expiry_time(response_headers, now, min_ttl)
+        if expires is None:
+            cache.delete(url)
+        else:
+            cache.refresh(url, response_headers, expires)
+        return CachedResponse(entry[0], {**entry[1], **response_headers}, entry[2], True, expires)
+    metrics.annotate(cache="miss")
+    expires = None
+    if response.status_code == 200:
+        expires = expiry_time(response_headers, now, min_ttl)
+        if expires is not None:
+            cache.put(url, response.status_code, response_headers, response.content, expires)
+    return CachedResponse(response.status_code, response_headers, response.content, False, expires)
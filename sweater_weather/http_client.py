@@ -0,0 +1,154 @@
+import random
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+from sweater_weather import metrics
+from sweater_weather.http_cache import cached_get, parse_http_date
+
+
+USER_AGENT = "sweater-weather"  # NWS and Nominatim both ask clients to identify themselves
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) in seconds
+RETRY_STATUSES = {429, 500, 502, 503, 504}  # NWS often answers 500/503 for "unexpected problem"
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5  # Seconds before the first retry; doubles each attempt
+MAX_BACKOFF = 10
+# Minimum seconds between requests to a host
+HOST_INTERVALS = {
+    "nominatim.openstreetmap.org": 1.0,  # Nominatim usage policy: at most one request per second
+    "ip-api.com": 1.5,  # Free tier allows 45 requests per minute
+}
+
+
+# Spaces out requests to one host so they start at least `interval` seconds apart
+class RateLimiter:
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_slot = 0
+
+    # Blocks until the caller may send a request
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Runs one call per key at a time; callers asking for a key that is already in flight wait for its result instead
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # Key -> Future of the call in flight
+
+    # Calls fn(), or waits for the identical call already running; returns (result, whether it was shared)
+    def do(self, key, fn):
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                del self.calls[key]
+        return future.result(), False
+
+
+# Reads a Retry-After header, given in seconds or as an HTTP date
+def retry_after_seconds(value, now=None):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        when = parse_http_date(value)
+        if when is None:
+            return None
+        return max(0.0, when - (now or time.time()))
+
+
+# Pooled keep-alive HTTP client shared by every outbound call
+class HttpClient:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES, host_intervals=None, pool_size=20):
+        # requests is imported here rather than at the top so it is only loaded once something is fetched
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.host_intervals = dict(HOST_INTERVALS if host_intervals is None else host_intervals)
+        self.limiters = {}
+        self.limiters_lock = threading.Lock()
+        self.flights = SingleFlight()
+
+    # Gets the rate limiter for a host, or None if the host is not limited
+    def limiter(self, host):
+        interval = self.host_intervals.get(host)
+        if not interval:
+            return None
+        with self.limiters_lock:
+            if host not in self.limiters:
+                self.limiters[host] = RateLimiter(interval)
+            return self.limiters[host]
+
+    # Sends a request (GET unless `method` says otherwise), retrying connection failures and retryable statuses
+    # with exponential backoff and jitter
+    def send(self, url, timeout=None, method="GET", **kwargs):
+        import requests
+        limiter = self.limiter(urlsplit(url).hostname)
+        attempt = 0
+        while True:
+            if limiter:
+                limiter.wait()
+            try:
+                response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    metrics.annotate(retries=attempt)
+                    raise
+                delay = None
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    metrics.annotate(status=response.status_code, bytes=len(response.content), retries=attempt)
+                    return response
+                delay = retry_after_seconds(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = random.uniform(0, min(MAX_BACKOFF, BACKOFF_BASE * 2 ** attempt))  # Full jitter
+            time.sleep(min(delay, MAX_BACKOFF))
+            attempt += 1
+
+    # Sends a GET, optionally through the on-disk response cache
+    # Cached GETs for a URL that is already being fetched wait for that fetch, so e.g. cities sharing an NWS grid cell
+    # download their forecast once
+    def get(self, url, cache=False, min_ttl=0, **kwargs):
+        if cache:
+            response, shared = self.flights.do(url, lambda: cached_get(self.send, url, min_ttl=min_ttl, **kwargs))
+            if shared:
+                metrics.annotate(cache="coalesced")
+            return response
+        return self.send(url, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+# Gets the shared client, creating it on first use
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
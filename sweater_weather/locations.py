@@ -0,0 +1,75 @@
+import json
+import threading
+from collections import namedtuple
+from sweater_weather.config import data_path, replace_file
+from sweater_weather.geocode import normalize_query
+
+
+SavedLocation = namedtuple("SavedLocation", ["name", "lat", "lon"])
+
+
+# Saved locations, kept in locations.json next to the preference files
+# Names are matched the same way as geocode lookups, so "Richardson, Texas" finds "Richardson, TX"
+class LocationsStore:
+    def __init__(self, path=None):
+        self.path = path or data_path("locations.json")
+        self.lock = threading.RLock()
+        self.locations = {}  # Normalized name -> SavedLocation, in the order they were saved
+        self.listeners = []
+        try:
+            with open(self.path, "r") as file:
+                for entry in json.load(file):
+                    location = SavedLocation(entry["name"], float(entry["lat"]), float(entry["lon"]))
+                    self.locations[normalize_query(location.name)] = location
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError):
+            self.locations = {}  # Unreadable file; it is replaced on the next save
+
+    # Registers a callback, called with no arguments whenever the saved locations change
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+
+    def notify(self):
+        for callback in list(self.listeners):
+            callback()
+
+    def all(self):
+        with self.lock:
+            return list(self.locations.values())
+
+    # Gets the saved location matching a name, or None
+    def get(self, name):
+        with self.lock:
+            return self.locations.get(normalize_query(name))
+
+    def add(self, name, lat, lon):
+        name = " ".join(name.split())
+        with self.lock:
+            self.locations[normalize_query(name)] = SavedLocation(name, lat, lon)
+            self.save()
+        self.notify()
+
+    def remove(self, name):
+        with self.lock:
+            if self.locations.pop(normalize_query(name), None) is None:
+                return
+            self.save()
+        self.notify()
+
+    # Writes the locations, replacing the file in one step so a crash cannot truncate it (lock must be held)
+    def save(self):
+        replace_file(self.path, json.dumps([location._asdict() for location in self.locations.values()]))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+# Gets the shared saved locations store
+def get_locations_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LocationsStore()
+        return _store
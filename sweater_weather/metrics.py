@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from sweater_weather.config import replace_file
+
+
+# Stage tracing and latency statistics
+# Turned on with enable() or SWEATER_WEATHER_METRICS=1; while off, span() hands back a shared no-op object
+
+
+ENABLED = os.environ.get("SWEATER_WEATHER_METRICS", "") not in ("", "0")
+WINDOW = 1024  # Durations kept per stage for percentiles
+QUANTILES = (0.5, 0.95, 0.99)
+logger = logging.getLogger("sweater_weather.metrics")  # One JSON object per finished span
+
+
+# The most recent durations of a stage, for percentiles over a rolling window
+class RollingHistogram:
+    def __init__(self, size=WINDOW):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    # Gets the nearest-rank percentile of the window (q between 0 and 1), or None if it is empty
+    def percentile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+# Running totals for one stage
+class StageStats:
+    def __init__(self):
+        self.durations = RollingHistogram()
+        self.errors = 0
+        self.cache = {}  # Cache result ("hit", "miss", "revalidated", "coalesced") -> count
+        self.retries = 0
+        self.bytes = 0
+
+
+stages = {}
+stages_lock = threading.Lock()
+local = threading.local()  # Per-thread stack of open spans
+
+
+# Times one stage; HTTP status, bytes, cache result and retries are attached with annotate()
+class Span:
+    def __init__(self, name):
+        self.name = name
+        self.attributes = {}
+
+    def __enter__(self):
+        if not hasattr(local, "stack"):
+            local.stack = []
+        local.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        local.stack.pop()
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        record(self)
+        return False
+
+
+# Stands in for Span while metrics are off
+class NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP = NoopSpan()
+
+
+# Starts a span for a stage, e.g. `with metrics.span("points"):`
+def span(name):
+    return Span(name) if ENABLED else NOOP
+
+
+# Attaches attributes to the innermost open span on this thread; retries are added up
+def annotate(**attributes):
+    if not ENABLED:
+        return
+    stack = getattr(local, "stack", None)
+    if stack:
+        current = stack[-1].attributes
+        retries = current.get("retries", 0) + attributes.pop("retries", 0)
+        current.update(attributes)
+        if retries:
+            current["retries"] = retries
+
+
+# Adds a finished span to its stage's statistics and the JSON log
+def record(finished):
+    with stages_lock:
+        stats = stages.setdefault(finished.name, StageStats())
+        stats.durations.add(finished.duration)
+        attributes = finished.attributes
+        stats.errors += "error" in attributes
+        stats.retries += attributes.get("retries", 0)
+        stats.bytes += attributes.get("bytes", 0)
+        if "cache" in attributes:
+            stats.cache[attributes["cache"]] = stats.cache.get(attributes["cache"], 0) + 1
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"stage": finished.name, "time": time.time(), "duration_ms": round(finished.duration * 1000, 3), **finished.attributes}))
+
+
+# Turns collection on or off
+def enable(flag=True):
+    global ENABLED
+    ENABLED = flag
+
+
+def reset():
+    with stages_lock:
+        stages.clear()
+
+
+# Gets the statistics of every stage, with durations in milliseconds
+def snapshot():
+    with stages_lock:
+        result = {}
+        for name, stats in stages.items():
+            entry = {"count": stats.durations.count, "errors": stats.errors, "retries": stats.retries, "bytes": stats.bytes, "cache": dict(stats.cache)}
+            for q in QUANTILES:
+                value = stats.durations.percentile(q)
+                entry[f"p{int(q * 100)}_ms"] = None if value is None else round(value * 1000, 3)
+            result[name] = entry
+        return result
+
+
+# Formats the statistics in the Prometheus text exposition format
+def prometheus_text():
+    lines = [
+        "# HELP sweater_weather_stage_duration_seconds Duration of each stage over the recent window.",
+        "# TYPE sweater_weather_stage_duration_seconds summary",
+    ]
+    with stages_lock:
+        items = sorted(stages.items())
+        for name, stats in items:
+            for q in QUANTILES:
+                value = stats.durations.percentile(q)
+                if value is not None:
+                    lines.append(f'sweater_weather_stage_duration_seconds{{stage="{name}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'sweater_weather_stage_duration_seconds_sum{{stage="{name}"}} {stats.durations.total:.6f}')
+            lines.append(f'sweater_weather_stage_duration_seconds_count{{stage="{name}"}} {stats.durations.count}')
+        for metric, help_text, field in (
+            ("errors", "Stages that raised an error.", "errors"),
+            ("retries", "HTTP retries made inside each stage.", "retries"),
+            ("bytes", "Response bytes read by each stage.", "bytes"),
+        ):
+            lines.append(f"# HELP sweater_weather_stage_{metric}_total {help_text}")
+            lines.append(f"# TYPE sweater_weather_stage_{metric}_total counter")
+            for name, stats in items:
+                lines.append(f'sweater_weather_stage_{metric}_total{{stage="{name}"}} {getattr(stats, field)}')
+        lines.append("# HELP sweater_weather_stage_cache_total Cache results by stage.")
+        lines.append("# TYPE sweater_weather_stage_cache_total counter")
+        for name, stats in items:
+            for result, count in sorted(stats.cache.items()):
+                lines.append(f'sweater_weather_stage_cache_total{{stage="{name}",result="{result}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+# Writes the Prometheus text to a file, replacing it in one step so scrapers never see half a file
+def write_prometheus(path):
+    replace_file(path, prometheus_text())
+
+
+# Serves /metrics (Prometheus text) and /metrics.json on localhost from a background thread
+def serve(port):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Rarely used and slow to import
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] == "/metrics":
+                body = prometheus_text().encode()
+                content_type = "text/plain; version=0.0.4"
+            elif self.path.split("?")[0] == "/metrics.json":
+                body = json.dumps(snapshot()).encode()
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Applies SWEATER_WEATHER_METRICS_LOG (JSON log file) and SWEATER_WEATHER_METRICS_PORT (endpoint port)
+# Either one also turns collection on
+def configure_from_environment():
+    log_path = os.environ.get("SWEATER_WEATHER_METRICS_LOG")
+    port = os.environ.get("SWEATER_WEATHER_METRICS_PORT")
+    if log_path:
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        enable()
+    if port:
+        serve(int(port))
+        enable()
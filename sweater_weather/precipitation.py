@@ -0,0 +1,91 @@
+import json
+import re
+import threading
+from functools import lru_cache
+from sweater_weather.config import data_path
+from sweater_weather.rules import PRECIPITATION
+
+
+# Keywords searched for in the NWS detailed forecast, by precipitation category
+DEFAULT_KEYWORDS = {
+    "Mixed": ["mixed", "mix", "sleet", "hail", "ice", "icy", "slush", "freezing rain", "frozen rain"],
+    "Snow": ["snow", "snows", "snowy", "snowing", "snowfall", "blizzard", "flurry", "flurries", "flurrying"],
+    "Rain": ["rain", "rains", "rainy", "raining", "rainfall", "shower", "showers", "thunderstorm", "thunderstorms"],
+}
+# Rain keywords that turn a snow forecast into Mixed ("snow showers" is still Snow)
+DEFAULT_MIXING_RAIN = ["rain", "rains", "rainy", "raining", "rainfall", "thunderstorm", "thunderstorms"]
+CACHE_SIZE = 4096  # Distinct forecast texts remembered; NWS repeats the same sentences a lot
+
+
+# Classifies forecast text as None, Rain, Snow or Mixed with one scan of a compiled word-boundary regex
+class PrecipitationClassifier:
+    def __init__(self, keywords=None, mixing_rain=None):
+        self.keywords = {category: list(words) for category, words in (keywords or DEFAULT_KEYWORDS).items()}
+        self.mixing_rain = set(DEFAULT_MIXING_RAIN if mixing_rain is None else mixing_rain)
+        self.compile()
+
+    # Adds keywords to a category, e.g. add_keywords("Rain", ["drizzle"]); scan only reports Rain, Snow and Mixed
+    def add_keywords(self, category, words):
+        if category not in PRECIPITATION[1:]:
+            raise ValueError(f"Unknown precipitation category {category!r} (expected one of {', '.join(PRECIPITATION[1:])})")
+        self.keywords.setdefault(category, []).extend(word.lower() for word in words)
+        self.compile()
+
+    # Rebuilds the regex and keyword lookup, and forgets memoized results
+    def compile(self):
+        self.categories = {}
+        for category, words in self.keywords.items():
+            for word in words:
+                self.categories[" ".join(word.lower().split())] = category
+        # Longest keywords first so "freezing rain" wins over "rain"
+        alternatives = sorted(self.categories, key=len, reverse=True)
+        pattern = "|".join(r"\s+".join(re.escape(part) for part in word.split()) for word in alternatives)
+        self.regex = re.compile(r"\b(?:" + pattern + r")\b") if pattern else None
+        self.classify = lru_cache(maxsize=CACHE_SIZE)(self.scan)
+
+    # Gets (category, matched keywords) for a forecast text; memoized as self.classify
+    def scan(self, text):
+        if self.regex is None:
+            return "None", ()
+        tokens = []
+        for match in self.regex.finditer(text.lower()):
+            token = " ".join(match.group().split())
+            if token not in tokens:
+                tokens.append(token)
+        found = {self.categories[token] for token in tokens}
+        if "Mixed" in found:
+            category = "Mixed"
+        elif "Snow" in found:
+            # Both rain and snow mentioned is Mixed
+            category = "Mixed" if any(token in self.mixing_rain for token in tokens) else "Snow"
+        elif "Rain" in found:
+            category = "Rain"
+        else:
+            category = "None"
+        return category, tuple(tokens)
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+# Gets the shared classifier, including any extra keywords saved in precipitation.json
+# ({"Rain": ["drizzle"], ...})
+def get_classifier():
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            # Built in full before it is shared, so a bad precipitation.json leaves no half-loaded classifier behind
+            classifier = PrecipitationClassifier()
+            try:
+                with open(data_path("precipitation.json"), "r") as file:
+                    extra = json.load(file)
+            except FileNotFoundError:
+                extra = {}
+            for category, words in extra.items():
+                try:
+                    classifier.add_keywords(category, words)
+                except ValueError as e:
+                    raise ValueError(f"{data_path('precipitation.json')}: {e}") from None
+            _classifier = classifier
+        return _classifier
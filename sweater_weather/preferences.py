@@ -0,0 +1,227 @@
+import csv
+import json
+import os
+import threading
+from collections import namedtuple
+from sweater_weather.config import data_path, replace_file
+from sweater_weather.rules import FACTORS, FACTOR_LIMITS, SEASONS, RuleEngine, condition_data, dead_rules, parse_condition
+
+
+# A rule applies when its factor is within [min, max] and its extra conditions ("when", see rules.parse_condition) are met
+# Either part may be left out: rules saved before conditions existed have no "when", and a rule with only conditions has no factor
+ClothingRule = namedtuple("ClothingRule", ["season", "clothing", "factor", "min", "max", "when"], defaults=(None,))
+RatingRule = namedtuple("RatingRule", ["rating", "factor", "min", "max", "when"], defaults=(None,))
+KINDS = {
+    "clothing": ("clothing.json", ClothingRule),
+    "ratings": ("ratings.json", RatingRule),
+}
+
+
+# Raised when a preferences file or entry is malformed
+class PreferencesError(ValueError):
+    pass
+
+
+# Checks one saved entry and converts it to a rule tuple
+def parse_rule(kind, entry):
+    rule_type = KINDS[kind][1]
+    fields = rule_type._fields[:-1]  # Every field but "when"
+    when = (entry.get("when") if isinstance(entry, dict) else None) or None  # Blank in CSV files and the editor
+    if isinstance(when, str):
+        raise PreferencesError('Conditions must be written as JSON, e.g. {"time": "morning"}.')
+    if when is not None:
+        try:
+            when = parse_condition(when)
+        except ValueError as e:
+            raise PreferencesError(f"Invalid conditions: {e}")
+    try:
+        values = {field: entry.get(field) if when and field in ("factor", "min", "max") else entry[field] for field in fields}
+        rule = rule_type(**values, when=when)
+    except (KeyError, TypeError, AttributeError):
+        raise PreferencesError(f"Entry {entry!r} must have the fields {', '.join(fields)}.")
+    name = rule.clothing if kind == "clothing" else rule.rating
+    if not isinstance(name, str) or not name.strip():
+        raise PreferencesError(f"Entry {entry!r} has no name.")
+    if kind == "clothing" and rule.season not in ["all seasons"] + SEASONS:
+        raise PreferencesError(f"Unknown season {rule.season!r}.")
+    if when and not rule.factor:
+        return rule._replace(factor=None, min=None, max=None)  # Conditions only
+    if rule.factor not in FACTORS:
+        raise PreferencesError(f"Unknown weather factor {rule.factor!r}.")
+    if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in (rule.min, rule.max)):
+        raise PreferencesError(f"Entry {entry!r} must have numeric minimum and maximum values.")
+    return rule
+
+
+# Converts a rule back to the dictionary it is saved as; "when" is left out when there are no extra conditions
+def rule_entry(rule):
+    entry = rule._asdict()
+    if rule.when:
+        entry["when"] = condition_data(rule.when)
+    else:
+        del entry["when"]
+    return entry
+
+
+# Finds the rules of a kind that can never apply, as (position, reason) pairs
+# A rating can also be unreachable, since only the first matching rating is shown
+def find_dead_rules(kind, rules):
+    return dead_rules(rules, first_match=kind == "ratings")
+
+
+# Checks that a rule's range makes sense for its factor, as the editors require before saving
+def check_rule(rule):
+    if rule.factor is None:
+        return rule
+    if rule.min > rule.max:
+        raise PreferencesError("Minimum value cannot be larger than the maximum value.")
+    low, high = FACTOR_LIMITS[rule.factor]
+    if rule.min < low or rule.max > high:
+        raise PreferencesError(f"{rule.factor.capitalize()} values must be between {low} and {high}.")
+    return rule
+
+
+# Reads a number written as text (e.g. from a CSV file) as an int or float; anything else is returned unchanged
+def number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return value
+    return int(value) if value.is_integer() else value
+
+
+# Reads rule dictionaries from a JSON list (the format of clothing.json/ratings.json) or a CSV file with a header row
+# In CSV files, conditions are JSON text in the "when" column
+# Entries are not validated, so they can be corrected after importing
+def read_rules_file(kind, path):
+    fields = KINDS[kind][1]._fields
+    with open(path, "r", newline="") as file:
+        if path.lower().endswith(".csv"):
+            entries = [{field: row.get(field, "") for field in fields} for row in csv.DictReader(file)]
+            for entry in entries:
+                try:
+                    entry["when"] = json.loads(entry["when"]) if entry["when"] else None
+                except ValueError:
+                    pass  # Left as text, which the editor reports as invalid
+        else:
+            entries = json.load(file)
+            if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+                raise PreferencesError("Preferences file must contain a list of rules.")
+            entries = [{field: entry.get(field, None if field == "when" else "") for field in fields} for entry in entries]
+    for entry in entries:
+        entry["min"], entry["max"] = number(entry["min"]), number(entry["max"])
+    return entries
+
+
+# Writes rule dictionaries as JSON, or as CSV if the path ends in .csv
+def write_rules_file(kind, path, entries):
+    fields = KINDS[kind][1]._fields
+    with open(path, "w", newline="") as file:
+        if path.lower().endswith(".csv"):
+            writer = csv.DictWriter(file, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows({**entry, "when": json.dumps(entry["when"]) if entry.get("when") else ""} for entry in entries)
+        else:
+            json.dump([{field: entry.get(field) for field in fields if field != "when" or entry.get("when")} for entry in entries], file, indent=1)
+
+
+# In-memory cache of the clothing and rating preferences
+# Files are reparsed only when their modification time or size changes, and saved atomically
+class PreferencesStore:
+    def __init__(self, directory=None):
+        self.paths = {kind: os.path.join(directory, name) if directory else data_path(name) for kind, (name, _) in KINDS.items()}
+        self.lock = threading.RLock()
+        self.stamps = {}  # (mtime, size) of each file when it was last read, None if it was missing
+        self.loaded = {}  # Rule list, or the exception raised while loading it
+        self.listeners = []
+        self.version = 0  # Increases whenever any rules change
+        self.compiled = None  # (version, RuleEngine)
+
+    # Registers a callback, called with the kind ("clothing" or "ratings") whenever those rules change
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+
+    def notify(self, kind):
+        for callback in list(self.listeners):
+            callback(kind)
+
+    # Gets a file's (mtime, size), or None if it does not exist
+    def stamp(self, kind):
+        try:
+            info = os.stat(self.paths[kind])
+        except FileNotFoundError:
+            return None
+        return info.st_mtime_ns, info.st_size
+
+    # Rereads a file if it has changed since it was last read; returns whether it did
+    def refresh(self, kind):
+        stamp = self.stamp(kind)
+        with self.lock:
+            if kind in self.loaded and self.stamps.get(kind) == stamp:
+                return False
+            changed = kind in self.loaded  # The first read is not a change
+            if stamp is None:
+                loaded = FileNotFoundError(f"No such file: {self.paths[kind]}")
+            else:
+                try:
+                    with open(self.paths[kind], "r") as file:
+                        entries = json.load(file)
+                    if not isinstance(entries, list):
+                        raise PreferencesError("Preferences file must contain a list.")
+                    loaded = [parse_rule(kind, entry) for entry in entries]
+                except (OSError, ValueError) as e:
+                    loaded = e
+            self.stamps[kind] = stamp
+            self.loaded[kind] = loaded
+            self.version += 1
+        if changed:
+            self.notify(kind)
+        return True
+
+    # Gets the rules of a kind; raises FileNotFoundError if none are saved, or the error that stopped them loading
+    def rules(self, kind):
+        self.refresh(kind)
+        loaded = self.loaded[kind]
+        if isinstance(loaded, Exception):
+            raise loaded
+        return loaded
+
+    # Gets the rules of a kind, or an empty list if none are saved
+    def rules_or_empty(self, kind):
+        try:
+            return self.rules(kind)
+        except FileNotFoundError:
+            return []
+
+    # Gets the rule engine for the current preferences, compiling it only after a change
+    def engine(self):
+        clothing = self.rules_or_empty("clothing")
+        ratings = self.rules_or_empty("ratings")
+        with self.lock:
+            if self.compiled is None or self.compiled[0] != self.version:
+                self.compiled = (self.version, RuleEngine(clothing, ratings))
+            return self.compiled[1]
+
+    # Validates and saves a list of rule dictionaries, replacing the file in one step so a crash cannot truncate it
+    def save(self, kind, entries):
+        rules = [parse_rule(kind, entry) for entry in entries]
+        path = self.paths[kind]
+        with self.lock:
+            replace_file(path, json.dumps([rule_entry(rule) for rule in rules]))
+            self.stamps[kind] = self.stamp(kind)
+            self.loaded[kind] = rules
+            self.version += 1
+        self.notify(kind)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+# Gets the shared preferences store
+def get_preferences_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PreferencesStore()
+        return _store
@@ -0,0 +1,90 @@
+import atexit
+import queue
+import threading
+import time
+from sweater_weather.config import HISTORY
+
+
+# Hands fetched forecasts to the history store (see history.py) from a background thread, a batch at a time
+# The store needs NumPy, which is only imported on that thread, so fetching a forecast never waits for it
+BATCH_DELAY = 2.0  # Seconds to wait for more forecasts before writing a batch
+MAX_BATCH = 64  # Forecasts per batch
+FLUSH = object()  # Queued to write the current batch at once
+
+
+class HistoryRecorder:
+    def __init__(self, directory=None):
+        self.directory = directory  # History folder; the shared store's when None
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.disabled = False  # Set when NumPy is not installed or the store cannot be opened, so nothing more is queued
+        self.error = None  # Last error while writing; history is kept on a best-effort basis
+
+    # Queues one fetched forecast (URL and NWS response JSON) for the history store
+    def record(self, url, data):
+        if self.disabled:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="history-recorder", daemon=True)
+                self.thread.start()
+        self.queue.put((url, data))
+
+    # Waits until every forecast queued so far is written (or dropped, if the store could not be opened)
+    def flush(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.put(FLUSH)
+            self.queue.join()
+
+    def run(self):
+        try:
+            from sweater_weather.history import HistoryStore, get_history_store
+        except ImportError:
+            self.disabled = True
+            store = None
+        else:
+            try:
+                store = HistoryStore(self.directory) if self.directory else get_history_store()
+            except Exception as e:
+                # Forecasts still queued are taken off below without being written, so flush() does not wait forever
+                self.error = e
+                self.disabled = True
+                store = None
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + BATCH_DELAY
+            while batch[-1] is not FLUSH and len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                forecasts = [item for item in batch if item is not FLUSH]
+                if store is not None and forecasts:
+                    store.append_forecasts(forecasts)
+            except Exception as e:
+                self.error = e
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+# Gets the shared recorder, which writes whatever is still queued when the program exits
+def get_recorder():
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = HistoryRecorder()
+            atexit.register(lambda: _recorder.flush())
+        return _recorder
+
+
+# Queues a fetched forecast for the history, unless history is turned off (SWEATER_WEATHER_HISTORY=0)
+def record_forecast(url, data):
+    if HISTORY:
+        get_recorder().record(url, data)
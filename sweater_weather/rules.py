@@ -0,0 +1,371 @@
+import math
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+
+FACTORS = ["temperature", "precipitation", "wind speed", "precipitation chance", "wind gust"]  # Chance in percent, gusts in mph
+PRECIPITATION = ["None", "Rain", "Snow", "Mixed"]  # Precipitation codes 0 - 3
+SEASONS = ["spring", "summer", "autumn", "winter"]
+# Values a rule's range may cover, per factor
+FACTOR_LIMITS = {
+    "temperature": (-80, 140),
+    "precipitation": (0, 3),
+    "wind speed": (0, 140),
+    "precipitation chance": (0, 100),
+    "wind gust": (0, 140),
+}
+# Parts of the day a condition can name, as (first hour, hour after the last); night runs past midnight
+TIMES_OF_DAY = {"morning": (5, 12), "afternoon": (12, 17), "evening": (17, 21), "night": (21, 5)}
+MAX_BOXES = 256  # Alternatives a condition may split into before dead rule checks give up on it
+QUERY_CACHE_SIZE = 1024  # Distinct values each interval index remembers the matches for
+
+
+# Reads a rule's extra conditions from their saved form into nested tuples, which can be hashed and cached:
+#   {"factor": "wind speed", "min": 15, "max": 140} -> ("range", factor, min, max); min or max may be left out
+#   {"season": "winter"} or {"season": ["autumn", "winter"]} -> ("season", seasons)
+#   {"time": "morning"} or {"time": [6, 12]} -> ("time", hours, as given); the local hour the forecast period starts
+#   {"all": [...]} and {"any": [...]} -> ("all", conditions) and ("any", conditions)
+# Raises ValueError if a condition is malformed
+def parse_condition(data):
+    if not isinstance(data, dict):
+        raise ValueError(f"Condition {data!r} must be an object.")
+    for kind in ("all", "any"):
+        if kind in data:
+            parts = data[kind]
+            if not isinstance(parts, list) or not parts:
+                raise ValueError(f"{kind!r} must be a list of conditions.")
+            return kind, tuple(parse_condition(part) for part in parts)
+    if "factor" in data:
+        factor = data["factor"]
+        if factor not in FACTORS:
+            raise ValueError(f"Unknown weather factor {factor!r}.")
+        low, high = data.get("min", FACTOR_LIMITS[factor][0]), data.get("max", FACTOR_LIMITS[factor][1])
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in (low, high)):
+            raise ValueError(f"Condition {data!r} must have numeric minimum and maximum values.")
+        return "range", factor, low, high
+    if "season" in data:
+        seasons = [data["season"]] if isinstance(data["season"], str) else data["season"]
+        if not isinstance(seasons, list) or not seasons or any(season not in SEASONS for season in seasons):
+            raise ValueError(f"Unknown season {data['season']!r}.")
+        return "season", tuple(season for season in SEASONS if season in seasons)
+    if "time" in data:
+        spec = data["time"]
+        start, end = TIMES_OF_DAY[spec] if isinstance(spec, str) and spec in TIMES_OF_DAY else spec if isinstance(spec, list) and len(spec) == 2 else (None, None)
+        if not all(isinstance(hour, int) and not isinstance(hour, bool) and 0 <= hour <= 24 for hour in (start, end)):
+            raise ValueError(f"Time {spec!r} must be {', '.join(TIMES_OF_DAY)} or [first hour, hour after the last].")
+        hours = range(start, end) if start <= end else range(start, end + 24)
+        return "time", tuple(hour % 24 for hour in hours), spec if isinstance(spec, str) else (start, end)
+    raise ValueError(f"Condition {data!r} needs one of factor, season, time, all or any.")
+
+
+# Converts a parsed condition back to its saved form
+def condition_data(condition):
+    kind = condition[0]
+    if kind in ("all", "any"):
+        return {kind: [condition_data(part) for part in condition[1]]}
+    if kind == "range":
+        return {"factor": condition[1], "min": condition[2], "max": condition[3]}
+    if kind == "season":
+        return {"season": condition[1][0] if len(condition[1]) == 1 else list(condition[1])}
+    return {"time": condition[2] if isinstance(condition[2], str) else list(condition[2])}
+
+
+# Describes a parsed condition, e.g. "temperature is 0 - 50 and (wind speed is 15 - 140 or in the morning)"
+def describe(condition, nested=False):
+    kind = condition[0]
+    if kind in ("all", "any"):
+        text = f" {'and' if kind == 'all' else 'or'} ".join(describe(part, True) for part in condition[1])
+        return f"({text})" if nested and len(condition[1]) > 1 else text
+    if kind == "range":
+        _, factor, low, high = condition
+        return f"{factor} is {low}" if low == high else f"{factor} is {low} - {high}"
+    if kind == "season":
+        return "in " + " or ".join(condition[1])
+    spec = condition[2]
+    return f"in the {spec}" if isinstance(spec, str) else f"from {clock(spec[0])} to {clock(spec[1])}"
+
+
+# Formats an hour of the day, e.g. 18 as "6pm"
+def clock(hour):
+    return "{}{}".format(hour % 12 or 12, "am" if hour % 24 < 12 else "pm")
+
+
+# Gets a rule's whole condition: its factor range, if it has one, and its extra conditions
+# Clothing seasons are left out, since rules are already grouped by season
+def rule_condition(rule):
+    parts = ([("range", rule.factor, rule.min, rule.max)] if rule.factor else []) + ([rule.when] if rule.when else [])
+    return parts[0] if len(parts) == 1 else ("all", tuple(parts))
+
+
+# Whether one rule applies to a forecast period (values as for RuleEngine.suggestions) in a season
+# Gives the same answer as the engine, for checking a few rules without compiling an engine over all of them
+def rule_applies(rule, values, season=None):
+    if getattr(rule, "season", "all seasons") not in ("all seasons", season):
+        return False
+    return compile_condition(rule_condition(rule))(values, season)
+
+
+# Whether a rule's outcome can depend on the season: a clothing rule for one season, or a season condition
+@lru_cache(maxsize=4096)
+def uses_season(rule):
+    def check(condition):
+        return condition[0] == "season" or condition[0] in ("all", "any") and any(check(part) for part in condition[1])
+    return getattr(rule, "season", "all seasons") != "all seasons" or bool(rule.when) and check(rule.when)
+
+
+# Orders a condition's parts so that tests stop as early as possible; returns (condition, cost, chance of passing)
+# Ranges are assumed to be spread evenly over their factor's limits, and seasons and times over the year and day
+# "all" tries parts by cost / chance of failing and "any" by cost / chance of passing, the order with the lowest expected cost
+@lru_cache(maxsize=4096)
+def plan(condition):
+    kind = condition[0]
+    if kind == "range":
+        _, factor, low, high = condition
+        lowest, highest = FACTOR_LIMITS[factor]
+        return condition, 2, min(1, max(0, (min(high, highest) - max(low, lowest) + 1) / (highest - lowest + 1)))
+    if kind == "season":
+        return condition, 1, len(condition[1]) / len(SEASONS)
+    if kind == "time":
+        return condition, 1, len(condition[1]) / 24
+    parts = [plan(part) for part in condition[1]]
+    if kind == "all":
+        parts.sort(key=lambda part: part[1] / (1 - part[2]) if part[2] < 1 else math.inf)
+    else:
+        parts.sort(key=lambda part: part[1] / part[2] if part[2] > 0 else math.inf)
+    cost, reach = 0, 1  # Expected cost so far, and the chance of getting to the next part
+    for _, part_cost, chance in parts:
+        cost += reach * part_cost
+        reach *= chance if kind == "all" else 1 - chance
+    return (kind, tuple(part for part, _, _ in parts)), cost, reach if kind == "all" else 1 - reach
+
+
+# Compiles a condition into a test of (values, season), where values maps each factor (and "hour") to its forecast value
+# Parts are tested in plan order and stop as soon as the outcome is known
+@lru_cache(maxsize=4096)
+def compile_condition(condition):
+    condition = plan(condition)[0]
+    kind = condition[0]
+    if kind == "range":
+        _, factor, low, high = condition
+
+        def test(values, season):
+            value = values.get(factor)
+            return value is not None and low <= value <= high  # Factors missing from the forecast never match
+    elif kind == "season":
+        seasons = condition[1]
+
+        def test(values, season):
+            return season in seasons
+    elif kind == "time":
+        hours = frozenset(condition[1])
+
+        def test(values, season):
+            return values.get("hour") in hours
+    else:
+        tests = tuple(compile_condition(part) for part in condition[1])
+        if kind == "all":
+            def test(values, season):
+                for part in tests:
+                    if not part(values, season):
+                        return False
+                return True
+        else:
+            def test(values, season):
+                for part in tests:
+                    if part(values, season):
+                        return True
+                return False
+    return test
+
+
+# Splits a condition into the alternative "boxes" of forecasts it matches, each mapping a factor to its (min, max)
+# and "season"/"time" to the seasons/hours allowed; a condition no forecast can meet has no boxes
+# Gives None when there would be more than MAX_BOXES alternatives
+def condition_boxes(condition):
+    kind = condition[0]
+    if kind == "range":
+        box = {condition[1]: condition[2:]}
+        return [box] if possible(box) else []
+    if kind in ("season", "time"):
+        return [{kind: frozenset(condition[1])}] if condition[1] else []
+    parts = [condition_boxes(part) for part in condition[1]]
+    if None in parts:
+        return None
+    if kind == "any":
+        boxes = [box for part in parts for box in part]
+    else:
+        boxes = [{}]
+        for part in parts:
+            boxes = [merged for box in boxes for other in part if (merged := intersect(box, other)) is not None]
+            if len(boxes) > MAX_BOXES:
+                return None
+    return boxes if len(boxes) <= MAX_BOXES else None
+
+
+# Gets the forecasts two boxes both match, or None if there are none
+def intersect(box, other):
+    merged = dict(box)
+    for key, value in other.items():
+        if key not in merged:
+            merged[key] = value
+        elif key in ("season", "time"):
+            merged[key] = merged[key] & value
+        else:
+            merged[key] = (max(merged[key][0], value[0]), min(merged[key][1], value[1]))
+    return merged if possible(merged) else None
+
+
+# Whether any forecast can fall in a box
+def possible(box):
+    for key, value in box.items():
+        if key in ("season", "time"):
+            if not value:
+                return False
+            continue
+        low, high = max(value[0], FACTOR_LIMITS[key][0]), min(value[1], FACTOR_LIMITS[key][1])
+        if low > high or (key == "precipitation" and math.ceil(low) > math.floor(high)):  # Codes are whole numbers
+            return False
+    return True
+
+
+# Whether every forecast in one box is also in another
+def within(inner, outer):
+    for key, value in outer.items():
+        if key not in inner:
+            return False
+        if key in ("season", "time"):
+            if not inner[key] <= value:
+                return False
+        elif not value[0] <= inner[key][0] <= inner[key][1] <= value[1]:
+            return False
+    return True
+
+
+# Finds rules that can never apply; returns (position, reason) pairs
+# With first_match (as for ratings), a rule also never applies when an earlier rule always matches first
+def dead_rules(rules, first_match=False):
+    dead = []
+    earlier = []  # (position, box) of every earlier rule
+    for i, rule in enumerate(rules):
+        condition = rule_condition(rule)
+        if getattr(rule, "season", "all seasons") != "all seasons":
+            condition = ("all", (("season", (rule.season,)), condition))
+        boxes = condition_boxes(condition)
+        if boxes == []:
+            dead.append((i, "its conditions can never all be met"))
+            continue
+        if boxes is None:
+            continue  # Too many alternatives to compare
+        if first_match:
+            covering = {next((j for j, box in earlier if within(mine, box)), None) for mine in boxes}
+            if None not in covering:
+                rows = sorted(j + 1 for j in covering)
+                dead.append((i, f"row{'s' if len(rows) > 1 else ''} {', '.join(map(str, rows))} above always match{'' if len(rows) > 1 else 'es'} first"))
+                continue
+            earlier.extend((i, box) for box in boxes)
+    return dead
+
+
+# Static index over closed intervals [min, max] answering "which intervals contain x" in O(log n + k log k)
+# A centered interval tree: each node keeps the intervals containing its center, sorted by min and by max, and
+# passes the ones wholly below or above it to its children. Each interval is stored in one node; builds in O(n log n)
+class IntervalIndex:
+    def __init__(self, intervals):
+        self.root = self.build(sorted(((lo, hi, value) for lo, hi, value in intervals if lo <= hi), key=lambda interval: interval[0]))
+        self.query = lru_cache(maxsize=QUERY_CACHE_SIZE)(self.search)  # Forecast values repeat a lot
+
+    # Builds a node as (center, mins, values by min, maxes, values by max, left, right) from intervals sorted by min
+    # The center is the middle interval's min, so neither child gets more than half of the intervals
+    def build(self, intervals):
+        if not intervals:
+            return None
+        center = intervals[len(intervals) // 2][0]
+        here = [interval for interval in intervals if interval[0] <= center <= interval[1]]
+        by_max = sorted(here, key=lambda interval: interval[1])
+        return (center, [lo for lo, _, _ in here], [value for _, _, value in here], [hi for _, hi, _ in by_max], [value for _, _, value in by_max],
+                self.build([interval for interval in intervals if interval[1] < center]),
+                self.build([interval for interval in intervals if interval[0] > center]))
+
+    # Gets the values of all intervals containing x, in ascending order; memoized as self.query
+    def search(self, x):
+        found = []
+        node = self.root
+        while node is not None:
+            center, mins, by_min, maxes, by_max, left, right = node
+            if x < center:
+                found.extend(by_min[:bisect_right(mins, x)])
+                node = left
+            elif x > center:
+                found.extend(by_max[bisect_left(maxes, x):])
+                node = right
+            else:
+                if x == center:  # Not NaN
+                    found.extend(by_min)
+                break
+        return tuple(sorted(found))
+
+
+# Builds one interval index per factor over the given rules, storing each rule's position in `rules`
+def index_by_factor(rules, positions):
+    return {factor: IntervalIndex([(rules[i].min, rules[i].max, i) for i in positions if rules[i].factor == factor]) for factor in FACTORS}
+
+
+# Clothing and rating rules (see preferences.ClothingRule/RatingRule) compiled into interval indexes
+# A rule's factor range is looked up in the indexes first; only the rules it lets through have their extra conditions tested
+class RuleEngine:
+    def __init__(self, clothing, ratings):
+        self.clothing = clothing
+        self.ratings = ratings
+        self.conditional = any(rule.when for rule in clothing) or any(rule.when for rule in ratings)
+        self.rating_index = index_by_factor(ratings, range(len(ratings)))
+        self.rating_open = [i for i, rule in enumerate(ratings) if not rule.factor]  # Rules with only extra conditions
+        self.rating_tests = [compile_condition(rule.when) if rule.when else None for rule in ratings]
+        self.clothing_index = {}
+        self.clothing_open = {}
+        for season in SEASONS:
+            positions = [i for i, c in enumerate(clothing) if c.season in ("all seasons", season)]
+            self.clothing_index[season] = index_by_factor(clothing, positions)
+            self.clothing_open[season] = [i for i in positions if not clothing[i].factor]
+        self.clothing_tests = [compile_condition(rule.when) if rule.when else None for rule in clothing]
+
+    # Gets the positions of every rating rule that applies, in saved order
+    def rating_matches(self, values, season=None):
+        candidates = set(self.rating_open).union(*(index.query(values[factor]) for factor, index in self.rating_index.items() if values.get(factor) is not None))
+        return [i for i in sorted(candidates) if self.rating_tests[i] is None or self.rating_tests[i](values, season)]
+
+    # Gets the positions of every clothing rule that applies in the season, in saved order
+    def clothing_matches(self, season, values):
+        index = self.clothing_index[season]
+        matches = sorted(set(self.clothing_open[season]).union(*(index[factor].query(values[factor]) for factor in FACTORS if values.get(factor) is not None)))
+        if self.conditional:
+            matches = [i for i in matches if self.clothing_tests[i] is None or self.clothing_tests[i](values, season)]
+        return matches
+
+    # Gets the first rating, in saved order, whose range contains its factor's value and whose conditions are met
+    def rating(self, values, season=None):
+        if self.conditional:
+            candidates = set(self.rating_open).union(*(index.query(values[factor]) for factor, index in self.rating_index.items() if values.get(factor) is not None))
+            for i in sorted(candidates):
+                if self.rating_tests[i] is None or self.rating_tests[i](values, season):
+                    return self.ratings[i].rating
+            return None
+        first = None
+        for factor, index in self.rating_index.items():
+            if values.get(factor) is None:
+                continue  # Not in this forecast (e.g. gusts in 12-hour periods)
+            matches = index.query(values[factor])
+            if matches and (first is None or matches[0] < first):
+                first = matches[0]
+        return None if first is None else self.ratings[first].rating
+
+    # Gets the rating followed by every matching clothing item for the season, in saved order and without repeats
+    # values maps each factor to its forecast value, with precipitation as its code, and "hour" to the local hour
+    def suggestions(self, season, values):
+        suggestions = []
+        rating = self.rating(values, season)
+        if rating is not None:
+            suggestions.append(rating)
+        for i in self.clothing_matches(season, values):
+            if self.clothing[i].clothing not in suggestions:
+                suggestions.append(self.clothing[i].clothing)
+        return suggestions
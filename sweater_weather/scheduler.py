@@ -0,0 +1,197 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from sweater_weather import core, weather
+from sweater_weather.geocode import normalize_query
+from sweater_weather.locations import get_locations_store
+
+
+# The freshest known forecast for one location and mode
+# expires is when NWS says the forecast stops being fresh; as_of is when NWS sent it
+Snapshot = namedtuple("Snapshot", ["label", "periods", "expires", "as_of"])
+CURRENT = ""  # Key of the location detected from the IP address
+MODES = (False, True)  # 12-hour and hourly forecasts
+MIN_INTERVAL = 60  # Seconds between refreshes of a location, however short its forecast's lifetime
+JITTER = 30  # Up to this many seconds are added to each refresh so saved locations do not all refresh at once
+RETRY_BASE = 30  # Seconds before retrying a location that failed; doubles with each failure in a row
+RETRY_MAX = 30 * 60
+
+
+# One location kept fresh by the scheduler
+class Target:
+    def __init__(self, label, lat=None, lon=None):
+        self.label = label
+        self.lat = lat  # None for the current location until the IP address is looked up
+        self.lon = lon
+        self.due = None  # Time of the next refresh
+        self.running = False
+        self.failures = 0
+        self.error = None
+
+
+# Refreshes saved locations (and the current location) in the background when their forecasts expire
+# Failing locations are retried with jittered exponential backoff
+class RefreshScheduler:
+    def __init__(self, store=None, workers=2, current_location=True):
+        self.store = store or get_locations_store()
+        self.workers = workers
+        self.current_location = current_location
+        self.lock = threading.Condition()
+        self.targets = {}  # Key -> Target
+        self.snapshots = {}  # (key, hourly) -> Snapshot
+        self.queue = []  # Heap of (due, sequence, key); entries whose due time no longer matches their target are skipped
+        self.sequence = itertools.count()
+        self.listeners = []
+        self.thread = None
+        self.executor = None
+        self.stopped = False
+
+    # Registers a callback, called from a background thread with a location key whenever its snapshots change
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+
+    def notify(self, key):
+        for callback in list(self.listeners):
+            callback(key)
+
+    # Gets the key for a location name, or for the current location when no name is given
+    def key(self, name=None):
+        return normalize_query(name) if name else CURRENT
+
+    # Starts refreshing every saved location, and prefetching the current location
+    def start(self):
+        with self.lock:
+            if self.thread:
+                return
+            self.stopped = False
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        self.store.subscribe(self.sync)
+        self.sync()
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+            self.lock.notify()
+            thread, self.thread = self.thread, None
+            executor, self.executor = self.executor, None
+        if thread:
+            thread.join()
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # Matches the targets to the saved locations; new ones are refreshed right away
+    def sync(self):
+        saved = {self.key(location.name): location for location in self.store.all()}
+        with self.lock:
+            for key in list(self.targets):
+                if key != CURRENT and key not in saved:
+                    del self.targets[key]
+                    for hourly in MODES:
+                        self.snapshots.pop((key, hourly), None)
+            for key, location in saved.items():
+                target = self.targets.get(key)
+                if target is None or (target.lat, target.lon) != (location.lat, location.lon):
+                    self.targets[key] = Target(location.name, location.lat, location.lon)
+                    self.schedule(key, time.time())
+            if self.current_location and CURRENT not in self.targets:
+                self.targets[CURRENT] = Target(None)
+                self.schedule(CURRENT, time.time())
+
+    # Sets a target's next refresh (lock must be held)
+    def schedule(self, key, due):
+        self.targets[key].due = due
+        heapq.heappush(self.queue, (due, next(self.sequence), key))
+        self.lock.notify()
+
+    # Refreshes a location as soon as possible, e.g. when a stale copy of it is on screen
+    def refresh_now(self, name=None):
+        key = self.key(name)
+        with self.lock:
+            target = self.targets.get(key)
+            if target and not target.running:
+                self.schedule(key, time.time())
+
+    # Hands due targets to the thread pool until stopped
+    def run(self):
+        with self.lock:
+            while not self.stopped:
+                now = time.time()
+                if self.queue and self.queue[0][0] <= now:
+                    due, _, key = heapq.heappop(self.queue)
+                    target = self.targets.get(key)
+                    if target and target.due == due and not target.running:
+                        target.running = True
+                        self.executor.submit(self.refresh, key, target)
+                    continue
+                self.lock.wait(self.queue[0][0] - now if self.queue else None)
+
+    # Fetches both forecast modes for a target and schedules its next refresh
+    def refresh(self, key, target):
+        try:
+            if key == CURRENT:
+                target.lat, target.lon, target.label = core.resolve_location()
+            self.seed(key, target)
+            fresh = {}
+            for hourly in MODES:
+                data, expires, as_of = weather.fetch_forecast_entry(weather.fetch_forecast_url(target.lat, target.lon, hourly=hourly))
+                fresh[(key, hourly)] = Snapshot(target.label, data['properties']['periods'], expires, as_of)
+        except Exception as e:
+            with self.lock:
+                target.running = False
+                target.failures += 1
+                target.error = str(e) or type(e).__name__
+                delay = min(RETRY_MAX, RETRY_BASE * 2 ** (target.failures - 1))
+                if self.targets.get(key) is target:
+                    self.schedule(key, time.time() + delay / 2 + random.uniform(0, delay / 2))
+            return
+        with self.lock:
+            target.running = False
+            target.failures = 0
+            target.error = None
+            if self.targets.get(key) is not target:
+                return  # Removed while it was being fetched
+            self.snapshots.update(fresh)
+            expires = min(snapshot.expires for snapshot in fresh.values())
+            self.schedule(key, max(expires, time.time() + MIN_INTERVAL) + random.uniform(0, JITTER))
+        self.notify(key)
+
+    # Fills in missing snapshots from the response cache, even expired ones, so there is something to show during the fetch
+    def seed(self, key, target):
+        seeded = False
+        for hourly in MODES:
+            if (key, hourly) in self.snapshots:
+                continue
+            stored = weather.peek_forecast(target.lat, target.lon, hourly)
+            if stored:
+                with self.lock:
+                    self.snapshots.setdefault((key, hourly), Snapshot(target.label, stored[0]['properties']['periods'], stored[1], stored[2]))
+                seeded = True
+        if seeded:
+            self.notify(key)
+
+    # Gets the freshest snapshot for a location name (or the current location), or None
+    def snapshot(self, name=None, hourly=False):
+        with self.lock:
+            return self.snapshots.get((self.key(name), hourly))
+
+    # Whether a location is being kept fresh
+    def is_tracked(self, name=None):
+        with self.lock:
+            return self.key(name) in self.targets
+
+    # Gets the error from a location's last failed refresh, or None
+    def error(self, name=None):
+        with self.lock:
+            target = self.targets.get(self.key(name))
+            return target.error if target else None
+
+
+# Whether a snapshot has expired, so a refresh is pending
+def is_stale(snapshot, now=None):
+    return snapshot.expires <= (now or time.time())
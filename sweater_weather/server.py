@@ -0,0 +1,320 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+from sweater_weather import core, metrics, weather
+from sweater_weather.geocode import normalize_query
+from sweater_weather.preferences import KINDS, PreferencesError, get_preferences_store, parse_rule
+from sweater_weather.rules import SEASONS, RuleEngine
+
+
+# Serves the forecast report as JSON to many clients from one process (python sweater-weather.py serve)
+# Every client shares the geocode index, grid cell index, response cache and HTTP client, and the forecasts in memory below
+# Fetches and report rendering run on a bounded thread pool, never on the event loop; identical fetches in flight are
+# made once, and requests beyond the queue limit are turned away (503) rather than queued without end
+#   GET /report?city=Dallas,+TX or /report?lat=32.95&lon=-96.73, optionally &hourly=1 and &season=winter
+#   POST /report with the same query and {"clothing": [...], "ratings": [...]} (as in clothing.json/ratings.json)
+#       to use those preferences instead of the saved ones
+#   GET /health for queue and cache statistics
+WORKERS = 16  # Fetches and reports worked on at the same time
+MAX_QUEUE = 64  # Fetches and reports waiting for a worker before new ones are turned away
+QUEUE_TIMEOUT = 10.0  # Seconds a fetch or report may wait for a worker
+MAX_CONNECTIONS = 1024
+IDLE_TIMEOUT = 15.0  # Seconds a keep-alive connection may wait for its next request
+REQUEST_TIMEOUT = 10.0  # Seconds a client has to send the headers and body once the request line has arrived
+MAX_HEADERS = 100  # Header lines a request may send
+MAX_BODY = 1024 * 1024  # Bytes of preferences a request may send
+MAX_LOCATIONS = 4096  # Forecasts kept in memory
+MAX_REPORTS = 4096  # Encoded reports kept in memory
+MAX_ENGINES = 256  # Rule engines kept for preferences sent with requests
+RETRY_AFTER = 1  # Seconds clients are asked to wait after a 503
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 431: "Request Header Fields Too Large", 501: "Not Implemented", 502: "Bad Gateway", 503: "Service Unavailable"}
+
+
+# Raised to answer a request with an error status and message
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Least recently used mapping that keeps at most `size` entries
+class LruCache(OrderedDict):
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def put(self, key, value):
+        self[key] = value
+        self.move_to_end(key)
+        while len(self) > self.size:
+            self.popitem(last=False)
+
+
+# Reads the location and options of a request's query string; returns (location key, city or None, lat, lon, hourly, season)
+def parse_query(query):
+    params = {name: values[-1] for name, values in parse_qs(query).items()}
+    hourly = params.get("hourly", "0").lower() in ("1", "true", "yes")
+    season = params.get("season") or core.get_season()
+    if season not in SEASONS:
+        raise ServiceError(400, f"Unknown season {season!r}.")
+    if params.get("city", "").strip():
+        city = " ".join(params["city"].split())
+        return f"city {normalize_query(city)} {hourly:d}", city, None, None, hourly, season
+    try:
+        lat, lon = float(params["lat"]), float(params["lon"])
+    except (KeyError, ValueError):
+        raise ServiceError(400, "Give a city, or lat and lon.")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ServiceError(400, "lat and lon are out of range.")
+    return f"point {lat:.4f},{lon:.4f} {hourly:d}", None, lat, lon, hourly, season
+
+
+# Fetches the forecast for a location on a worker thread; returns (label, lat, lon, periods, expires, as_of)
+def load_forecast(city, lat, lon, hourly):
+    label = city or f"{lat:.4f}, {lon:.4f}"
+    if city:
+        try:
+            lat, lon, label = core.resolve_location(city)
+        except core.LocationError as e:
+            raise ServiceError(404, str(e))
+        except Exception as e:
+            raise ServiceError(502, f"Error looking up {city}: {e}")
+    try:
+        data, expires, as_of = weather.fetch_forecast_entry(weather.fetch_forecast_url(lat, lon, hourly=hourly))
+    except Exception as e:
+        raise ServiceError(502, f"Error fetching weather data: {e}")
+    return label, lat, lon, data["properties"]["periods"], expires, as_of
+
+
+# Builds the report for a forecast as the JSON response body
+def report_body(forecast, engine, season, hourly, stale=False):
+    label, lat, lon, periods, expires, as_of = forecast
+    body = {"location": label, "lat": lat, "lon": lon, "season": season, "hourly": hourly, "as_of": as_of, "expires": expires, "stale": stale, "rows": [], "message": None}
+    if not engine.clothing and not engine.ratings:
+        body["message"] = core.NO_PREFERENCES
+    else:
+        with metrics.span("report"):
+            if hourly:
+                try:
+                    from sweater_weather import hourly as hourly_report  # Only hourly reports need NumPy
+                except ImportError:
+                    raise ServiceError(501, "Hourly reports need NumPy on the server.")
+                rows = hourly_report.hourly_rows(hourly_report.HourlyForecast(periods), engine, season)
+            else:
+                rows = core.report_rows(periods, engine, season)
+            body["rows"] = [row._asdict() for row in rows]
+        if not body["rows"]:
+            body["message"] = hourly_report.NO_SUGGESTIONS if hourly else core.NO_SUGGESTIONS
+    return json.dumps(body).encode()
+
+
+class ReportService:
+    def __init__(self, workers=WORKERS, max_queue=MAX_QUEUE, store=None):
+        self.store = store or get_preferences_store()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="serve")
+        self.slots = None  # Semaphore limiting fetches to `workers`; made on the event loop
+        self.workers = workers
+        self.max_queue = max_queue
+        self.waiting = 0  # Fetches waiting for a worker
+        self.flights = {}  # Location key -> Future of the fetch in flight
+        self.forecasts = LruCache(MAX_LOCATIONS)  # Location key -> (label, lat, lon, periods, expires, as_of)
+        self.reports = LruCache(MAX_REPORTS)  # (location key, as_of, engine key, season, stale) -> encoded response body
+        self.engines = LruCache(MAX_ENGINES)  # Digest of sent preferences -> RuleEngine
+        self.connections = 0
+        self.counts = {"requests": 0, "fetches": 0, "coalesced": 0, "shed": 0, "stale": 0}
+
+    # Gets the rule engine and its cache key for a request: the saved preferences, or those sent in the body
+    def engine(self, body):
+        if not body:
+            return self.store.engine(), f"saved {self.store.version}"
+        key = hashlib.sha1(body).hexdigest()
+        engine = self.engines.get(key)
+        if engine is None:
+            try:
+                data = json.loads(body)
+                if not isinstance(data, dict):
+                    raise PreferencesError("Preferences must be an object with clothing and ratings lists.")
+                rules = {kind: [parse_rule(kind, entry) for entry in data.get(kind) or []] for kind in KINDS}
+            except (ValueError, AttributeError) as e:
+                raise ServiceError(400, f"Invalid preferences: {e}")
+            engine = RuleEngine(rules["clothing"], rules["ratings"])
+            self.engines.put(key, engine)
+        return engine, key
+
+    # Gets the forecast for a location: from memory while NWS says it is fresh, otherwise fetched on a worker
+    # A fetch that is turned away or fails falls back to the copy in memory, marked stale, if there is one
+    async def forecast(self, key, city, lat, lon, hourly):
+        kept = self.forecasts.get(key)
+        if kept and kept[4] > time.time():
+            return kept, False
+        try:
+            return await self.fetch(key, city, lat, lon, hourly), False
+        except ServiceError as e:
+            if kept is None or e.status not in (502, 503):
+                raise
+            self.counts["stale"] += 1
+            return kept, True
+
+    # Fetches a location once however many requests ask for it while the fetch runs
+    async def fetch(self, key, city, lat, lon, hourly):
+        flight = self.flights.get(key)
+        if flight is not None:
+            self.counts["coalesced"] += 1
+            return await asyncio.shield(flight)
+        flight = self.flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            self.counts["fetches"] += 1
+            forecast = await self.run(load_forecast, city, lat, lon, hourly)
+            self.forecasts.put(key, forecast)
+            flight.set_result(forecast)
+            return forecast
+        except BaseException as e:
+            flight.set_exception(e)
+            flight.exception()  # Marks it retrieved when no other request was waiting
+            raise
+        finally:
+            del self.flights[key]
+
+    # Runs a blocking call on the worker pool, turning the request away if too many are already waiting
+    async def run(self, fn, *args):
+        if self.waiting >= self.max_queue:
+            self.counts["shed"] += 1
+            raise ServiceError(503, "Too many requests; try again shortly.")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.slots.acquire(), QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.counts["shed"] += 1
+            raise ServiceError(503, "Too many requests; try again shortly.")
+        finally:
+            self.waiting -= 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.slots.release()
+
+    # Answers /report; returns the encoded body
+    async def report(self, query, body):
+        key, city, lat, lon, hourly, season = parse_query(query)
+        engine, engine_key = self.engine(body)
+        forecast, stale = await self.forecast(key, city, lat, lon, hourly)
+        report_key = (key, forecast[5], engine_key, season, stale)
+        encoded = self.reports.get(report_key)
+        if encoded is None:
+            encoded = await self.run(report_body, forecast, engine, season, hourly, stale)  # Off the event loop, like fetches
+            self.reports.put(report_key, encoded)
+        return encoded
+
+    def health(self):
+        return json.dumps({**self.counts, "connections": self.connections, "in_flight": len(self.flights), "waiting": self.waiting,
+                           "forecasts": len(self.forecasts), "reports": len(self.reports), "engines": len(self.engines)}).encode()
+
+    # Answers one request; returns (status, encoded body, extra headers)
+    async def respond(self, method, target, body):
+        self.counts["requests"] += 1
+        path, query = urlsplit(target)[2:4]
+        try:
+            if path == "/health":
+                return 200, self.health(), {}
+            if path != "/report":
+                raise ServiceError(404, f"No such endpoint {path!r}.")
+            if method not in ("GET", "POST"):
+                raise ServiceError(405, "Use GET or POST.")
+            return 200, await self.report(query, body if method == "POST" else None), {}
+        except ServiceError as e:
+            headers = {"Retry-After": str(RETRY_AFTER)} if e.status == 503 else {}
+            return e.status, json.dumps({"error": str(e)}).encode(), headers
+        except Exception as e:
+            return 502, json.dumps({"error": str(e) or type(e).__name__}).encode(), {}
+
+    # Serves the requests of one keep-alive connection in turn
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            if self.connections > MAX_CONNECTIONS:
+                await self.send(writer, 503, json.dumps({"error": "Too many connections."}).encode(), {"Retry-After": str(RETRY_AFTER)}, close=True)
+                return
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    return
+                except (ValueError, asyncio.LimitOverrunError):  # Longer than the stream's line limit
+                    await self.send(writer, 400, b'{"error": "Request line is too long."}', {}, close=True)
+                    return
+                if not request_line.strip():
+                    return
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.send(writer, 400, b'{"error": "Malformed request."}', {}, close=True)
+                    return
+                try:
+                    headers, body = await asyncio.wait_for(self.read_request(reader), REQUEST_TIMEOUT)
+                except asyncio.TimeoutError:
+                    return  # A client that stalls mid-request does not get to keep its connection
+                except ServiceError as e:
+                    await self.send(writer, e.status, json.dumps({"error": str(e)}).encode(), {}, close=True)
+                    return
+                close = headers.get("connection", "").lower() == "close" or version == "HTTP/1.0"
+                status, encoded, extra = await self.respond(method, target, body)
+                await self.send(writer, status, encoded, extra, close)
+                if close:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    # Reads the headers and body that follow a request line; returns (headers with lowercase names, body)
+    async def read_request(self, reader):
+        headers = {}
+        try:
+            for count in range(MAX_HEADERS + 1):
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                if count == MAX_HEADERS:
+                    raise ServiceError(431, "Too many header lines.")
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+        except (ValueError, asyncio.LimitOverrunError):
+            raise ServiceError(431, "Header line is too long.")
+        length = headers.get("content-length") or "0"
+        if not length.isdigit():  # Also rules out negative lengths
+            raise ServiceError(400, "Invalid Content-Length.")
+        length = int(length)
+        if length > MAX_BODY:
+            raise ServiceError(413, "Preferences are too large.")
+        return headers, await reader.readexactly(length) if length else b""
+
+    async def send(self, writer, status, body, headers, close=False):
+        head = [f"HTTP/1.1 {status} {REASONS[status]}", "Content-Type: application/json", f"Content-Length: {len(body)}"]
+        head += [f"{name}: {value}" for name, value in headers.items()]
+        if close:
+            head.append("Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    # Listens on host:port until cancelled; `started` (if given) is called with the bound port once listening
+    async def serve(self, host="127.0.0.1", port=8000, started=None):
+        self.slots = asyncio.Semaphore(self.workers)
+        server = await asyncio.start_server(self.handle, host, port, backlog=MAX_CONNECTIONS)
+        if started:
+            started(server.sockets[0].getsockname()[1])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=False)
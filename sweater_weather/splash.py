@@ -0,0 +1,20 @@
+import sys
+from PyQt5.QtWidgets import QApplication, QSplashScreen
+from PyQt5.QtGui import QColor, QPixmap
+from PyQt5.QtCore import Qt
+
+
+app = None  # Kept here so the application outlives show_splash()
+
+
+# Creates the application and shows a splash screen before the rest of the program is imported
+def show_splash():
+    global app
+    app = QApplication.instance() or QApplication(sys.argv)
+    pixmap = QPixmap(320, 120)
+    pixmap.fill(QColor("#B0E0E6"))
+    splash = QSplashScreen(pixmap)
+    splash.showMessage("Sweater Weather\nLoading...", Qt.AlignCenter)
+    splash.show()
+    app.processEvents()
+    return splash
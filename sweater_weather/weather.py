@@ -0,0 +1,134 @@
+import json
+import time
+from sweater_weather import metrics
+from sweater_weather.config import IP_API_URL, NOMINATIM_URL, NWS_URL, SERVER_URL
+from sweater_weather.geocode import get_geocode_index
+from sweater_weather.grid_index import get_grid_index
+from sweater_weather.http_cache import get_cache, parse_http_date
+from sweater_weather.http_client import get_client
+from sweater_weather.recorder import record_forecast
+
+
+# Per-stage timeouts in seconds, as (connect, read)
+IP_TIMEOUT = (3.05, 5)
+GEOCODE_TIMEOUT = (3.05, 10)
+POINTS_TIMEOUT = (3.05, 10)
+FORECAST_TIMEOUT = (3.05, 15)
+POINTS_MIN_TTL = 24 * 60 * 60  # A point's forecast office and grid cell almost never change
+
+
+# Gets current location using IP address
+def fetch_current_location(timeout=IP_TIMEOUT):
+    with metrics.span("ip_location"):
+        response = get_client().get(IP_API_URL, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+    return data['lat'], data['lon'], data['city'], data['regionName']
+
+
+# Gets coordinates for a city name, or None if the name cannot be found
+# Known names are answered from the local geocode index; others are looked up on Nominatim and added to it
+def geocode_city(city_name, timeout=GEOCODE_TIMEOUT):
+    with metrics.span("geocode"):
+        index = get_geocode_index()
+        entry = index.lookup(city_name)
+        if entry:
+            metrics.annotate(cache="hit")
+            return entry["lat"], entry["lon"]
+        metrics.annotate(cache="miss")
+        response = get_client().get(NOMINATIM_URL, params={"q": city_name, "format": "json", "limit": 1}, timeout=timeout)
+        response.raise_for_status()
+        results = response.json()
+    if results:
+        lat, lon = float(results[0]["lat"]), float(results[0]["lon"])
+        index.add(city_name, lat, lon, results[0].get("display_name", city_name))
+        return lat, lon
+    return None
+
+
+def point_url(lat, lon):
+    return f"{NWS_URL}/points/{lat:.4f},{lon:.4f}"
+
+
+# Gets the NWS point metadata (forecast office, grid cell and forecast URLs) for a coordinate pair
+# Coordinates inside a grid cell seen before are answered from the grid cell index without a request
+def fetch_point(lat, lon, timeout=POINTS_TIMEOUT):
+    with metrics.span("points"):
+        known = get_grid_index().lookup(lat, lon)
+        if known:
+            metrics.annotate(cache="index")
+            return known
+        response = get_client().get(point_url(lat, lon), cache=True, min_ttl=POINTS_MIN_TTL, timeout=timeout)
+        response.raise_for_status()
+        point = response.json()['properties']
+    get_grid_index().add_point(point)
+    return point
+
+
+# Gets the NWS 12-hour forecast URL, or the hourly one, for a coordinate pair
+def fetch_forecast_url(lat, lon, timeout=POINTS_TIMEOUT, hourly=False):
+    return fetch_point(lat, lon, timeout)['forecastHourly' if hourly else 'forecast']
+
+
+# Gets the raw NWS gridpoint data (numeric time series per weather element) for a coordinate pair
+# Returns (properties, time zone name of the point)
+def fetch_gridpoint(lat, lon, timeout=FORECAST_TIMEOUT):
+    point = fetch_point(lat, lon)
+    with metrics.span("gridpoints"):
+        response = get_client().get(point['forecastGridData'], cache=True, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+    get_grid_index().add_outline(point['forecastGridData'], data.get('geometry'))
+    return data['properties'], point.get('timeZone')
+
+
+# Gets weather data from NWS API as JSON
+def fetch_forecast(forecast_url, timeout=FORECAST_TIMEOUT):
+    return fetch_forecast_entry(forecast_url, timeout)[0]
+
+
+# Gets weather data as (data, expires, as_of): when the response stops being fresh and when the server sent it
+# Every forecast fetched is also queued for the forecast history
+def fetch_forecast_entry(forecast_url, timeout=FORECAST_TIMEOUT):
+    with metrics.span("forecast"):
+        response = get_client().get(forecast_url, cache=True, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+    get_grid_index().add_outline(forecast_url, data.get('geometry'))  # The forecast area is the grid cell
+    record_forecast(forecast_url, data)
+    now = time.time()
+    return data, response.expires or now, parse_http_date(response.headers.get("date")) or now
+
+
+# Gets a report from the Sweater Weather service (see server.py) for a city name, or a coordinate pair when city is None
+# preferences ({"clothing": [...], "ratings": [...]}) are sent along so the report uses them instead of the service's
+# Returns the service's JSON: location, lat, lon, rows (ReportRow fields), message, as_of, expires and stale
+def fetch_report(city=None, lat=None, lon=None, hourly=False, season=None, preferences=None, timeout=FORECAST_TIMEOUT):
+    params = {"city": city} if city else {"lat": lat, "lon": lon}
+    params.update(hourly=int(hourly), **({"season": season} if season else {}))
+    with metrics.span("service"):
+        response = get_client().send(f"{SERVER_URL}/report", timeout=timeout, method="POST" if preferences else "GET", params=params, json=preferences)
+        try:
+            data = response.json()
+        except ValueError:
+            response.raise_for_status()
+            raise
+    if "error" in data:
+        raise RuntimeError(data["error"])
+    return data
+
+
+# Gets the last stored forecast for a coordinate pair from the response cache, fresh or not, without going to the network
+# Returns (data, expires, as_of) like fetch_forecast_entry, or None if it has never been fetched
+def peek_forecast(lat, lon, hourly=False):
+    cache = get_cache()
+    point = get_grid_index().lookup(lat, lon)
+    if point is None:
+        stored = cache.get(point_url(lat, lon))
+        if stored is None:
+            return None
+        point = json.loads(stored[2])['properties']
+    entry = cache.get(point['forecastHourly' if hourly else 'forecast'])
+    if entry is None:
+        return None
+    return json.loads(entry[2]), entry[3], parse_http_date(entry[1].get("date")) or entry[3]
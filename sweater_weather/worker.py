@@ -0,0 +1,133 @@
+import threading
+import time
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from sweater_weather import dashboard, weather
+from sweater_weather.config import SERVER_URL
+from sweater_weather.core import ReportRow
+from sweater_weather.preferences import get_preferences_store, rule_entry
+
+
+# Raised between stages when a fetch has been cancelled or replaced
+class FetchCancelled(Exception):
+    pass
+
+
+# Signals must live on a QObject, so the runnable carries one of these
+class WorkerSignals(QObject):
+    progress = pyqtSignal(int, str)  # Job id, status message
+    finished = pyqtSignal(int, object)  # Job id, result dictionary
+    failed = pyqtSignal(int, str)  # Job id, error message
+    result = pyqtSignal(int, object)  # Job id, one partial result of a job that produces many
+
+
+# Runs the location and forecast stages of a fetch on the thread pool
+class ForecastWorker(QRunnable):
+    def __init__(self, job_id, city_name, use_current_location, hourly=False, grid=False, season=None):
+        super().__init__()
+        self.job_id = job_id
+        self.city_name = city_name
+        self.use_current_location = use_current_location
+        self.hourly = hourly or grid
+        self.grid = grid  # Use the raw gridpoint time series; the result is an hourly.HourlyForecast instead of periods
+        self.season = season
+        self.signals = WorkerSignals()
+        self._cancelled = threading.Event()
+
+    # Requests cancellation; takes effect at the next stage boundary
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    # Reports progress and stops the pipeline if the job is no longer wanted
+    def stage(self, message):
+        if self._cancelled.is_set():
+            raise FetchCancelled()
+        self.signals.progress.emit(self.job_id, message)
+
+    def run(self):
+        try:
+            # With a Sweater Weather service set, it looks up cities and fetches the report (grid data is always fetched here)
+            remote = SERVER_URL and not self.grid
+            # Get coordinates
+            if self.use_current_location:
+                self.stage("Detecting current location...")
+                try:
+                    lat, lon, city, region = weather.fetch_current_location()
+                except Exception as e:
+                    raise RuntimeError(f"Error fetching location data. Try selecting a different location, or try again later.\nError details: {e}")
+                label = f"{city}, {region}"
+            elif remote:
+                lat, lon, label = None, None, self.city_name
+            else:
+                self.stage(f"Looking up {self.city_name}...")
+                try:
+                    coordinates = weather.geocode_city(self.city_name)
+                except Exception as e:
+                    raise RuntimeError(f"Error fetching forecast data. Try selecting a different location.\nError details: {e}")
+                if not coordinates:
+                    raise RuntimeError("Invalid city name, please try again.")
+                lat, lon = coordinates
+                label = self.city_name
+            # Fetch weather data
+            result = {"label": label, "hourly": self.hourly}
+            try:
+                if remote:
+                    self.stage(f"Asking {SERVER_URL} about {label}...")
+                    engine = get_preferences_store().engine()  # The window's own preferences are sent along
+                    preferences = {"clothing": [rule_entry(rule) for rule in engine.clothing], "ratings": [rule_entry(rule) for rule in engine.ratings]}
+                    report = weather.fetch_report(None if self.use_current_location else self.city_name, lat, lon, self.hourly, self.season, preferences)
+                    lat, lon = report["lat"], report["lon"]
+                    result.update(periods=None, rows=[ReportRow(**row) for row in report["rows"]], message=report["message"])
+                elif self.grid:
+                    self.stage(f"Fetching grid data for {label}...")
+                    properties, timezone = weather.fetch_gridpoint(lat, lon)
+                    from sweater_weather.gridpoints import GridSeries  # Only grid mode needs NumPy
+                    from sweater_weather.hourly import HourlyForecast
+                    result["periods"] = HourlyForecast.from_grid(GridSeries(properties, timezone), since=time.time())
+                else:
+                    self.stage(f"Finding forecast office for {label}...")
+                    forecast_url = weather.fetch_forecast_url(lat, lon, hourly=self.hourly)
+                    self.stage(f"Fetching forecast for {label}...")
+                    result["periods"] = weather.fetch_forecast(forecast_url)['properties']['periods']
+            except FetchCancelled:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Error fetching weather data. Try selecting a different location, or try again later.\nError details: {e}")
+            if self._cancelled.is_set():
+                raise FetchCancelled()
+            self.signals.finished.emit(self.job_id, {**result, "lat": lat, "lon": lon})
+        except FetchCancelled:
+            pass
+        except Exception as e:
+            if not self._cancelled.is_set():
+                self.signals.failed.emit(self.job_id, str(e))
+
+
+# Fetches the dashboard locations concurrently, emitting each row as it arrives
+class DashboardWorker(QRunnable):
+    def __init__(self, job_id, names):
+        super().__init__()
+        self.job_id = job_id
+        self.names = names
+        self.signals = WorkerSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        count = 0
+        try:
+            for row in dashboard.fetch_dashboard(self.names):
+                if self._cancelled.is_set():
+                    continue  # Let the fetches in flight finish, but show nothing more
+                count += 1
+                self.signals.result.emit(self.job_id, row)
+        except Exception as e:
+            if not self._cancelled.is_set():
+                self.signals.failed.emit(self.job_id, str(e))
+            return
+        if not self._cancelled.is_set():
+            self.signals.finished.emit(self.job_id, count)